@@ -1,13 +1,17 @@
-import wx
-import wx.grid
-import wx.lib.scrolledpanel as scrolled
-from simpleai.search import genetic
-from kanren import Relation, facts, run, var
+import argparse
 import random
 import json
+import sys
 import numpy as np
-import threading
+import heapq
+import time
 import os
+import math
+import itertools
+from array import array
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 # -------------------- CONSTANTS --------------------
 DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
@@ -15,57 +19,187 @@ SHIFTS = ['morning', 'afternoon']
 SLOT_PER_SHIFT = 16
 SLOT_PER_DAY = SLOT_PER_SHIFT * 2
 TOTAL_SLOTS = len(DAYS) * SLOT_PER_DAY
-MAX_PATIENTS_PER_SHIFT = 3
+SLOT_MINUTES = 15
+WEEKS = 1
+MAX_PATIENTS_PER_SHIFT = 3  # default when a doctor has no max_patients_per_shift
 
-# -------------------- CORE LOGIC (from original code) --------------------
-available_slot = Relation()
+# Genetic algorithm defaults
+POPULATION_SIZE = 100
+MUTATION_CHANCE = 0.3
+ITERATIONS_LIMIT = 300
+ELITE_SIZE = 2
+TOURNAMENT_SIZE = 3
+STAGNATION_LIMIT = 50
+GREEDY_SEED_FRACTION = 0.2  # share of the initial population built by the priority-ordered heuristic
+MEMETIC_RATE = 0.1  # share of offspring passed through repair and local search
+LOCAL_SEARCH_PASSES = 2
+PROGRESS_MAX_RATE = 5  # live progress updates per second
+FITNESS_CACHE_SIZE = 10000
+SHARED_CHUNK_BITS = 6  # copies of an incremental schedule share its per-patient/slot/shift lists in 64-entry chunks
+SHARED_CHUNK_MASK = (1 << SHARED_CHUNK_BITS) - 1
+SHARED_MIN_LENGTH = 1024  # shorter lists are cheaper to copy whole than to share
+
+# Island model: workers > 1 evolves ISLANDS sub-populations in separate processes
+WORKERS = 1
+ISLANDS = 4
+MIGRATION_INTERVAL = 10
+MIGRANTS = 2
+ISLAND_SEED = 0
+
+# Specialty decomposition: one GA per specialty, then a short global pass on the merged schedule
+DECOMPOSE_BY_SPECIALTY = False
+MERGE_GENERATIONS = 30
+
+# Anytime solving: run until a time budget is spent, retuning the GA as it goes
+BUDGET_TARGET_GENERATIONS = 20  # the population is sized so about this many generations fit the budget
+BUDGET_INIT_SHARE = 0.2  # share of the budget for the initial population after the first greedy state
+BUDGET_TABLE_SHARE = 0.5  # the move table is only built if it takes at most this share of what is left
+MIN_POPULATION_SIZE = 10
+MAX_POPULATION_SIZE = 300
+MIN_MUTATION_CHANCE = 0.05
+MAX_MUTATION_CHANCE = 0.9
+ADAPT_INTERVAL = 5  # generations between adjustments
+CONVERGED_DIVERSITY = 0.02  # population_diversity below this counts as converged
+IMMIGRANT_SHARE = 0.2  # share of a converged, stagnant population replaced by random states
+PROBE_CHILDREN = 5  # children timed before the first generation to estimate the cost per child
+
+# Warm-start rescheduling: a short GA that only moves patients around the changes
+RESCHEDULE_POPULATION_SIZE = 30
+RESCHEDULE_GENERATIONS = 60
+RESCHEDULE_STAGNATION_LIMIT = 15
+RESCHEDULE_TIME_LIMIT = 0.5
+RESCHEDULE_CHANGE_PENALTY = 5
+
+# On-disk result cache: unchanged input and settings return the stored schedule
+RESULT_CACHE_DIR = '.lichlamviec_cache'
+RESULT_CACHE_SIZE = 64
+RESULT_CACHE_VERSION = 1  # bump when scoring or the solver changes, so old entries are not reused
+
+# Roster loading: JSON is read in chunks, snapshots are directories of .npy arrays opened with mmap
+LOAD_CHUNK_SIZE = 1 << 16
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BLOCK = 4096  # patients whose slot bitsets are unpacked at once
+
+# -------------------- CALENDAR --------------------
+# Slots are numbered day by day and shift by shift, so every (day, shift) is one contiguous range
+# and slot // slots_per_shift is its flat key day_idx * n_shifts + shift_idx.
+class Calendar:
+    def __init__(self, days=DAYS, shifts=SHIFTS, slots_per_shift=SLOT_PER_SHIFT, weeks=WEEKS,
+                 slot_minutes=SLOT_MINUTES):
+        if not days or not shifts or slots_per_shift < 1 or weeks < 1 or slot_minutes < 1:
+            raise ValueError(f"Invalid calendar: {len(days)} days, {len(shifts)} shifts, "
+                             f"{slots_per_shift} slots per shift, {weeks} weeks, {slot_minutes} minutes")
+        self.week_days = list(days)
+        self.shifts = list(shifts)
+        self.slots_per_shift = slots_per_shift
+        self.weeks = weeks
+        self.slot_minutes = slot_minutes
+        # Past the first week days are labelled with their week, e.g. 'Mon W2'
+        self.days = [day if week == 0 else f"{day} W{week + 1}" for week in range(weeks) for day in self.week_days]
+        self.n_days = len(self.days)
+        self.n_shifts = len(self.shifts)
+        self.slots_per_day = slots_per_shift * self.n_shifts
+        self.total_slots = self.n_days * self.slots_per_day
+        self.keys_per_doctor = self.n_days * self.n_shifts
+        self.full_mask = (1 << self.total_slots) - 1
+
+    def __eq__(self, other):
+        return isinstance(other, Calendar) and self.settings() == other.settings()
+
+    def __hash__(self):
+        return hash((tuple(self.week_days), tuple(self.shifts), self.slots_per_shift, self.weeks, self.slot_minutes))
+
+    def settings(self):
+        return {'days': self.week_days, 'shifts': self.shifts, 'slots_per_shift': self.slots_per_shift,
+                'weeks': self.weeks, 'slot_minutes': self.slot_minutes}
+
+    def day_shift_slot(self, index):
+        if index < 0 or index >= self.total_slots:
+            raise ValueError(f"Invalid slot index: {index}")
+        key, slot = divmod(index, self.slots_per_shift)
+        day_idx, shift_idx = divmod(key, self.n_shifts)
+        return self.days[day_idx], self.shifts[shift_idx], slot
+
+    def shift_key(self, slot_int):
+        return divmod(slot_int // self.slots_per_shift, self.n_shifts)
+
+    def slot_keys(self):
+        return [slot_int // self.slots_per_shift for slot_int in range(self.total_slots)]
+
+    def all_shifts(self, week=None):
+        days = range(self.n_days) if week is None else range(week * len(self.week_days),
+                                                             (week + 1) * len(self.week_days))
+        return [(day_idx, shift_idx, f"{self.days[day_idx]}_{shift}")
+                for day_idx in days for shift_idx, shift in enumerate(self.shifts)]
+
+    def shift_range(self, day_idx, shift_idx):
+        start = (day_idx * self.n_shifts + shift_idx) * self.slots_per_shift
+        return start, start + self.slots_per_shift
+
+    def duration_slots(self, minutes):
+        return minutes // self.slot_minutes
+
+    def ranges_mask(self, ranges):
+        mask = 0
+        for start, end in ranges:
+            start, end = max(int(start), 0), min(int(end), self.total_slots)
+            if start < end:
+                mask |= ((1 << (end - start)) - 1) << start
+        return mask
+
+    def mask_ranges(self, mask):
+        # [start, end) runs of set bits, the compact form free slots are stored in
+        ranges = []
+        offset = 0
+        while mask:
+            skip = (mask & -mask).bit_length() - 1
+            mask >>= skip
+            offset += skip
+            run = (~mask & (mask + 1)).bit_length() - 1
+            ranges.append([offset, offset + run])
+            mask >>= run
+            offset += run
+        return ranges
+
+    def free_mask(self, doctor):
+        if 'free_ranges' in doctor:
+            return self.ranges_mask(doctor['free_ranges'])
+        mask = 0
+        for label in doctor.get('free_slots', []):
+            slot_int = parse_slot_label(label, self.total_slots)
+            if slot_int is not None:
+                mask |= 1 << slot_int
+        return mask
 
-def generate_doctor_schedule(doctors):
+DEFAULT_CALENDAR = Calendar()
+
+# -------------------- CORE LOGIC (from original code) --------------------
+def generate_doctor_schedule(doctors, calendar=DEFAULT_CALENDAR, seed=None):
     for doctor in doctors:
-        all_shifts = []
-        for day_idx, day in enumerate(DAYS):
-            for shift_idx, shift in enumerate(SHIFTS):
-                all_shifts.append((day_idx, shift_idx, f"{day}_{shift}"))
-        
-        off_shift = random.choice(all_shifts)
-        doctor['off_shifts'] = [off_shift]
-        
-        free_slots = []
-        off_day_idx, off_shift_idx, _ = off_shift
-        
-        for day_idx in range(len(DAYS)):
-            for shift_idx in range(len(SHIFTS)):
-                if day_idx == off_day_idx and shift_idx == off_shift_idx:
-                    continue
-                
-                start_slot = day_idx * SLOT_PER_DAY + shift_idx * SLOT_PER_SHIFT
-                for slot_in_shift in range(SLOT_PER_SHIFT):
-                    slot_index = start_slot + slot_in_shift
-                    free_slots.append(str(slot_index))
-        
-        doctor['free_slots'] = free_slots
-
-def get_day_shift_slot(index):
-    if index < 0 or index >= TOTAL_SLOTS:
-        raise ValueError(f"Invalid slot index: {index}")
-    
-    day_idx = index // SLOT_PER_DAY
-    day = DAYS[day_idx]
-    remaining = index % SLOT_PER_DAY
-    shift = 'morning' if remaining < SLOT_PER_SHIFT else 'afternoon'
-    slot = remaining % SLOT_PER_SHIFT
-    
-    return day, shift, slot
-
-def get_shift_key(slot_int):
-    day_idx = slot_int // SLOT_PER_DAY
-    shift_idx = (slot_int % SLOT_PER_DAY) // SLOT_PER_SHIFT
-    return (day_idx, shift_idx)
+        # One random off shift per week. With a seed each doctor draws from its own generator,
+        # so adding or reordering doctors does not change the others' off shifts
+        rng = random if seed is None else random.Random(f"{seed}:{doctor.get('name')}")
+        off_shifts = [rng.choice(calendar.all_shifts(week)) for week in range(calendar.weeks)]
+        set_doctor_off_shifts(doctor, off_shifts, calendar)
+
+def set_doctor_off_shifts(doctor, off_shifts, calendar=DEFAULT_CALENDAR):
+    doctor['off_shifts'] = [tuple(off) for off in off_shifts]
+    off_mask = calendar.ranges_mask(calendar.shift_range(off[0], off[1]) for off in off_shifts
+                                    if 0 <= off[0] < calendar.n_days and 0 <= off[1] < calendar.n_shifts)
+    doctor.pop('free_slots', None)
+    doctor['free_ranges'] = calendar.mask_ranges(calendar.full_mask & ~off_mask)
+
+def has_doctor_schedule(doctor):
+    return 'free_ranges' in doctor or 'free_slots' in doctor
+
+def get_day_shift_slot(index, calendar=DEFAULT_CALENDAR):
+    return calendar.day_shift_slot(index)
+
+def get_shift_key(slot_int, calendar=DEFAULT_CALENDAR):
+    return calendar.shift_key(slot_int)
 
 def define_doctor_availability(doctors):
-    for doc in doctors:
-        for free in doc.get('free_slots', []):
-            facts(available_slot, (doc['name'], free))
+    return AvailabilityIndex(doctors)
 
 def is_doctor_working(doctor, day_idx, shift_idx):
     off_shifts = doctor.get('off_shifts', [])
@@ -74,159 +208,270 @@ def is_doctor_working(doctor, day_idx, shift_idx):
             return False
     return True
 
+def workload_variance(workload_values):
+    # Exact population variance, so the batched evaluator reproduces it bit for bit
+    return variance_from_sums(len(workload_values), sum(workload_values),
+                              sum(w * w for w in workload_values))
+
+def variance_from_sums(n, total, total_sq):
+    if n < 2:
+        return 0
+    return (n * total_sq - total * total) / (n * n)
+
+def parse_slot_label(label, total_slots=TOTAL_SLOTS):
+    if not isinstance(label, str) or not label.isdigit() or str(int(label)) != label:
+        return None
+    slot_int = int(label)
+    return slot_int if slot_int < total_slots else None
+
+# -------------------- CHROMOSOME ENCODING --------------------
+# A chromosome is an array('i') with one gene per patient: doctor_index * total_slots + slot,
+# or -1 when the patient is unassigned. Doctor names resolve to their first occurrence.
+def build_doctor_index(doctors):
+    doctor_index = {}
+    for doc_idx, doc in enumerate(doctors):
+        doctor_index.setdefault(doc.get('name'), doc_idx)
+    return doctor_index
+
+def encode_gene(assign, doctor_index, total_slots=TOTAL_SLOTS):
+    if isinstance(assign, (int, np.integer)):
+        return int(assign) if assign >= 0 else -1
+    if not assign:
+        return -1
+    slot, doctor = assign
+    try:
+        slot_int = int(slot)
+    except (ValueError, TypeError):
+        return -1
+    doc_idx = doctor_index.get(doctor)
+    if doc_idx is None or not 0 <= slot_int < total_slots:
+        return -1
+    return doc_idx * total_slots + slot_int
+
+def encode_state(state, doctors, n_patients=None, doctor_index=None, total_slots=TOTAL_SLOTS):
+    doctor_index = doctor_index or build_doctor_index(doctors)
+    n_patients = len(state) if n_patients is None else n_patients
+    encoded = array('i', [encode_gene(assign, doctor_index, total_slots) for assign in list(state)[:n_patients]])
+    encoded.extend([-1] * (n_patients - len(encoded)))
+    return encoded
+
+def decode_gene(gene, doctors, total_slots=TOTAL_SLOTS):
+    if gene is None or gene < 0:
+        return None
+    doc_idx, slot_int = divmod(gene, total_slots)
+    if doc_idx >= len(doctors):
+        return None
+    return slot_int, doctors[doc_idx]['name']
+
+def decode_state(state, doctors, total_slots=TOTAL_SLOTS):
+    decoded = []
+    for gene in state:
+        assign = decode_gene(gene, doctors, total_slots)
+        decoded.append((str(assign[0]), assign[1]) if assign else None)
+    return decoded
+
 class ScheduleProblem:
-    def __init__(self, doctors, patients):
+    def __init__(self, doctors, patients, incremental=False, cache_size=FITNESS_CACHE_SIZE, availability=None,
+                 calendar=None):
         self.doctors = doctors
         self.patients = patients
+        self.incremental = incremental
+        self.calendar = calendar or (availability.calendar if availability else DEFAULT_CALENDAR)
+        self.cache = FitnessCache(cache_size) if cache_size else None
+        self.availability = availability or AvailabilityIndex(doctors, self.calendar)
+        self.candidates = CandidateIndex(doctors, patients, self.availability, self.calendar)
+        self.evaluator = PopulationEvaluator(doctors, patients, self.availability, self.calendar)
+        # Patient indices mutation may touch; None = all of them
+        self.mutable = None
+        self.move_table = None
+        self.move_index = None
+        self.slot_ordered_moves = None
+
+    def encode(self, state):
+        if isinstance(state, TrackedSchedule):
+            return state.genes
+        if isinstance(state, array) and len(state) == len(self.patients):
+            return state
+        return encode_state(state, self.doctors, len(self.patients), self.evaluator.doctor_index,
+                            self.calendar.total_slots)
+
+    def decode(self, state):
+        return decode_state(self.encode(state), self.doctors, self.calendar.total_slots)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        if not isinstance(snapshot, RosterSnapshot):
+            snapshot = RosterSnapshot(snapshot)
+        return cls(snapshot.doctors, snapshot.patients, calendar=snapshot.calendar, **kwargs)
 
     def generate_random_state(self):
-        state = []
-        for patient in self.patients:
-            if patient.get('priority', 0) < 0 or not patient.get('free_slots', []):
-                state.append(None)
-                continue
+        state = array('i', [-1] * len(self.patients))
+        priorities = self.evaluator.priority_list
+        for i in range(len(self.patients)):
+            choices = self.candidates.choices[i]
+            if priorities[i] >= 0 and choices:
+                state[i] = random.choice(choices)
+        return self.track(state) if self.incremental else state
 
-            doctor_choices = [doc for doc in self.doctors
-                              if doc.get('specialty') == patient.get('specialty')]
-            if not doctor_choices:
-                state.append(None)
+    def generate_greedy_state(self):
+        # Highest priority first, equal priorities in random order. A candidate is only taken while its
+        # slots are free and its shift is below the cap, so the state has no conflicts or penalties;
+        # among those the earliest slot wins, ties broken at random.
+        evaluator = self.evaluator
+        capacity = evaluator.capacity_list
+        total_slots = self.calendar.total_slots
+        if self.slot_ordered_moves is None:
+            self.slot_ordered_moves = [sorted(moves, key=lambda move: move[0] % total_slots)
+                                       for moves in self.load_move_table()]
+        state = array('i', [-1] * len(self.patients))
+        used = 0
+        shift_count = [0] * (len(self.doctors) * evaluator.keys_per_doctor)
+        order = sorted(range(len(self.patients)), key=lambda i: (-evaluator.priority_list[i], random.random()))
+        for i in order:
+            if evaluator.priority_list[i] < 0:
                 continue
-
-            valid_slots = []
-            for slot in patient.get('free_slots', []):
-                try:
-                    slot_int = int(slot)
-                    day_idx, shift_idx = slot_int // SLOT_PER_DAY, (slot_int % SLOT_PER_DAY) // SLOT_PER_SHIFT
-                    
-                    for doc in doctor_choices:
-                        if is_doctor_working(doc, day_idx, shift_idx) and str(slot) in doc.get('free_slots', []):
-                            valid_slots.append((slot, doc['name']))
-                except ValueError:
+            best_slot, best = total_slots, []
+            for move in self.slot_ordered_moves[i]:
+                slot_int = move[0] % total_slots
+                if slot_int > best_slot:
+                    break
+                if used & move[2] or shift_count[move[1]] >= capacity[move[1]]:
                     continue
+                best_slot = slot_int
+                best.append(move)
+            if best:
+                gene, key, mask = random.choice(best)[:3]
+                state[i] = gene
+                shift_count[key] += 1
+                used |= mask
+        return self.track(state) if self.incremental else state
 
-            if valid_slots:
-                state.append(random.choice(valid_slots))
-            else:
-                state.append(None)
+    def track(self, state):
+        return TrackedSchedule(self, self.encode(state))
 
-        return state
+    def shift_counts(self, state):
+        evaluator = self.evaluator
+        counts = [0] * (len(self.doctors) * evaluator.keys_per_doctor)
+        total_slots = self.calendar.total_slots
+        for gene in self.encode(state):
+            if gene >= 0:
+                doc_idx, slot_int = divmod(gene, total_slots)
+                counts[doc_idx * evaluator.keys_per_doctor + evaluator.slot_keys[slot_int]] += 1
+        return counts
 
     def count_patients_per_shift(self, state):
         shift_count = {}
-        for i, assign in enumerate(state):
-            if not assign or i >= len(self.patients):
-                continue
-            slot, doctor = assign
-            try:
-                slot_int = int(slot)
-                shift_key = get_shift_key(slot_int)
-                day_idx, shift_idx = shift_key
-                doctor_shift_key = (doctor, day_idx, shift_idx)
+        for gene in self.encode(state):
+            assign = decode_gene(gene, self.doctors, self.calendar.total_slots)
+            if assign:
+                slot_int, doctor = assign
+                doctor_shift_key = (doctor, *self.calendar.shift_key(slot_int))
                 shift_count[doctor_shift_key] = shift_count.get(doctor_shift_key, 0) + 1
-            except (ValueError, TypeError):
-                continue
         return shift_count
 
     def value(self, state):
         if not state:
             return 0
+        if isinstance(state, TrackedSchedule):
+            return state.fitness
+        state = self.encode(state)
+        if self.cache is None:
+            return self.compute_value(state)
 
+        key = self.cache.key(state)
+        score = self.cache.get(key)
+        if score is None:
+            score = self.compute_value(state)
+            self.cache.put(key, score)
+        return score
+
+    def compute_value(self, state):
+        evaluator = self.evaluator
+        total_slots = self.calendar.total_slots
         score = 0
         doctor_workload = {}
-        slot_usage = {}
-        shift_count = self.count_patients_per_shift(state)
-
-        for i, assign in enumerate(state):
-            if not assign or i >= len(self.patients):
-                continue
-
-            patient = self.patients[i]
-            slot, doctor = assign
+        slot_usage = bytearray(total_slots)
+        shift_count = self.shift_counts(state)
 
-            try:
-                slot_int = int(slot)
-            except (ValueError, TypeError):
+        for i, gene in enumerate(state):
+            if gene < 0:
                 continue
 
-            duration = patient.get('duration', 15) // 15
-            if slot_int + duration > TOTAL_SLOTS:
+            doc_idx, slot_int = divmod(gene, total_slots)
+            duration = evaluator.duration_list[i]
+            if slot_int + duration > total_slots:
                 continue
 
-            slots_needed = [str(slot_int + j) for j in range(duration)]
-
-            conflict = False
-            for s in slots_needed:
-                if s in slot_usage:
-                    conflict = True
-                    break
-
-            if conflict:
+            # Durations below one slot need no slots at all
+            span_end = slot_int + max(duration, 0)
+            if any(slot_usage[slot_int:span_end]):
                 continue
 
-            doc_obj = next((d for d in self.doctors if d.get('name') == doctor), None)
-            if not doc_obj:
+            if evaluator.free_run_list[doc_idx][slot_int] < duration:
                 continue
 
-            if not all(s in doc_obj.get('free_slots', []) for s in slots_needed):
+            slot_key = evaluator.slot_keys[slot_int]
+            if not evaluator.working_list[doc_idx][slot_key]:
                 continue
 
-            day_idx, shift_idx = slot_int // SLOT_PER_DAY, (slot_int % SLOT_PER_DAY) // SLOT_PER_SHIFT
-            if not is_doctor_working(doc_obj, day_idx, shift_idx):
-                continue
-            
-            doctor_shift_key = (doctor, day_idx, shift_idx)
-            current_count = shift_count.get(doctor_shift_key, 0)
-            if current_count > MAX_PATIENTS_PER_SHIFT:
+            key = doc_idx * evaluator.keys_per_doctor + slot_key
+            if shift_count[key] > evaluator.capacity_list[key]:
                 score -= 1000
                 continue
-                
-            for s in slots_needed:
-                slot_usage[s] = (doctor, i)
 
-            priority = patient.get('priority', 1)
-            score += priority * 10 + max(0, 100 - slot_int)
-            
-            if current_count <= MAX_PATIENTS_PER_SHIFT:
-                score += 50
+            slot_usage[slot_int:span_end] = b'\x01' * (span_end - slot_int)
+
+            priority = evaluator.priority_list[i]
+            score += priority * 10 + max(0, 100 - slot_int) + 50
 
-            doctor_workload[doctor] = doctor_workload.get(doctor, 0) + duration
+            doctor_workload[doc_idx] = doctor_workload.get(doc_idx, 0) + duration
 
-        workload_values = list(doctor_workload.values())
-        imbalance = np.var(workload_values) if len(workload_values) > 1 else 0
+        imbalance = workload_variance(list(doctor_workload.values()))
 
         return score - (imbalance * 0.5)
 
+    def evaluate_population(self, states):
+        if self.incremental:
+            return np.array([self.value(state) for state in states], dtype=float)
+        population = self.evaluator.encode_population([self.encode(state) for state in states])
+        if self.cache is None:
+            return self.evaluator.evaluate(population)
+
+        keys = [self.cache.key(row) for row in population]
+        scores = np.array([self.cache.get(key) for key in keys], dtype=float)
+        missing = np.flatnonzero(np.isnan(scores))
+        if len(missing):
+            # Duplicates inside one batch are scored once
+            unique_keys = {}
+            for row in missing:
+                unique_keys.setdefault(keys[row], row)
+            rows = list(unique_keys.values())
+            for row, score in zip(rows, self.evaluator.evaluate(population[rows])):
+                self.cache.put(keys[row], float(score))
+            scores[missing] = [self.cache.peek(keys[row]) for row in missing]
+        return scores
+
     def mutate(self, state):
         if not state or not self.patients:
             return state
+        if isinstance(state, TrackedSchedule):
+            return self.mutate_tracked(state)
 
-        new_state = list(state)
+        new_state = array('i', self.encode(state))
+        shift_count = None
         for _ in range(10):
-            idx = random.randint(0, len(state) - 1)
-            patient = self.patients[idx]
-
-            doctor_choices = [doc for doc in self.doctors
-                              if doc.get('specialty') == patient.get('specialty')]
-
-            if not doctor_choices or not patient.get('free_slots', []):
+            idx = self.mutation_index(len(new_state))
+            choices = self.candidates.choices[idx]
+            if not choices:
                 continue
 
-            valid_combinations = []
-            for slot in patient.get('free_slots', []):
-                try:
-                    slot_int = int(slot)
-                    day_idx, shift_idx = slot_int // SLOT_PER_DAY, (slot_int % SLOT_PER_DAY) // SLOT_PER_SHIFT
-                    
-                    for doc in doctor_choices:
-                        if str(slot) in doc.get('free_slots', []) and is_doctor_working(doc, day_idx, shift_idx):
-                            temp_state = list(new_state)
-                            temp_state[idx] = (slot, doc['name'])
-                            shift_count = self.count_patients_per_shift(temp_state)
-                            doctor_shift_key = (doc['name'], day_idx, shift_idx)
-                            if shift_count.get(doctor_shift_key, 0) <= MAX_PATIENTS_PER_SHIFT:
-                                valid_combinations.append((slot, doc['name']))
-                except (ValueError, TypeError):
-                    continue
+            # A candidate adds exactly one to its own shift, after the current gene leaves
+            if shift_count is None:
+                shift_count = self.shift_counts(new_state)
+            current_key = self.gene_key(new_state[idx])
+            capacity = self.evaluator.capacity_list
+            valid_combinations = [gene for gene, key in zip(choices, self.candidates.key_ids[idx])
+                                  if shift_count[key] - (key == current_key) < capacity[key]]
 
             if valid_combinations:
                 new_state[idx] = random.choice(valid_combinations)
@@ -234,372 +479,2112 @@ class ScheduleProblem:
 
         return new_state
 
-    def crossover(self, s1, s2):
-        if not s1 or not s2:
-            return s1 or s2 or []
+    def mutation_index(self, n_patients):
+        if self.mutable:
+            return random.choice(self.mutable)
+        return random.randint(0, n_patients - 1)
 
-        if len(s1) != len(s2):
-            min_len = min(len(s1), len(s2))
-            s1 = s1[:min_len]
-            s2 = s2[:min_len]
+    def build_move_table(self):
+        # Per patient: (gene, shift key, slot mask, doctor, gain) of every candidate whose doctor is
+        # free for the whole duration; only slot usage and shift counts remain to check in repair()
+        evaluator = self.evaluator
+        total_slots = self.calendar.total_slots
+        table = []
+        for i, (genes, keys) in enumerate(zip(self.candidates.choices, self.candidates.key_ids)):
+            duration = evaluator.duration_list[i]
+            moves = []
+            for gene, key in zip(genes, keys):
+                doc_idx, slot_int = divmod(gene, total_slots)
+                if slot_int + duration <= total_slots and evaluator.free_run_list[doc_idx][slot_int] >= duration:
+                    moves.append((gene, key, evaluator.span_masks[i] << slot_int, doc_idx,
+                                  evaluator.priority_list[i] * 10 + max(0, 100 - slot_int) + 50))
+            table.append(moves)
+        return table
 
-        cut = random.randint(1, len(s1) - 1) if len(s1) > 1 else 1
-        return s1[:cut] + s2[cut:]
-
-# -------------------- wxPython GUI --------------------
-
-class ScheduleGrid(wx.grid.Grid):
-    def __init__(self, parent):
-        super().__init__(parent)
-        
-        # Create grid structure
-        self.CreateGrid(0, 6)  # Start with 0 rows, 6 columns
-        
-        # Set column labels
-        self.SetColLabelValue(0, "Ngày")
-        self.SetColLabelValue(1, "Ca")
-        self.SetColLabelValue(2, "Bệnh nhân")
-        self.SetColLabelValue(3, "Bác sĩ")
-        self.SetColLabelValue(4, "Slot")
-        self.SetColLabelValue(5, "Ưu tiên")
-        
-        # Set column widths
-        self.SetColSize(0, 80)
-        self.SetColSize(1, 80)
-        self.SetColSize(2, 100)
-        self.SetColSize(3, 120)
-        self.SetColSize(4, 60)
-        self.SetColSize(5, 80)
-        
-        # Make grid read-only
-        self.EnableEditing(False)
-
-    def update_schedule(self, result, patients):
-        # Clear existing data
-        if self.GetNumberRows() > 0:
-            self.DeleteRows(0, self.GetNumberRows())
-        
-        schedule_data = []
-        for i, assign in enumerate(result.state):
-            if assign and i < len(patients):
-                slot, doctor = assign
-                patient = patients[i]
-                try:
-                    slot_int = int(slot)
-                    day, shift, time_slot = get_day_shift_slot(slot_int)
-                    schedule_data.append([
-                        day, shift, f"BN{patient.get('id', i+1)}", 
-                        doctor, str(time_slot), str(patient.get('priority', 1))
-                    ])
-                except Exception:
+    def load_move_table(self):
+        if self.move_table is None:
+            self.move_table = self.build_move_table()
+            # gene -> move per patient, so the move of a known gene is found in constant time
+            self.move_index = [{move[0]: move for move in moves} for moves in self.move_table]
+        return self.move_table
+
+    def repair(self, state, passes=LOCAL_SEARCH_PASSES):
+        # Memetic step. First walk the genes in order and move every gene that would be skipped or
+        # penalized to its best feasible candidate (or unassign it); then hill-climb with relocations,
+        # insertions and swaps. Slot usage is a bitmap and each doctor's free runs are folded into
+        # the move table, so every move is checked in constant time. All kept genes are accepted,
+        # which makes the fitness delta of a move exact: its gain plus the change in workload variance.
+        # With self.mutable set only those patients move; the others keep their gene as it is, even
+        # where it is skipped or penalized.
+        move_table = self.load_move_table()
+        move_index = self.move_index
+        movable = set(self.mutable) if self.mutable else None
+        durations = self.evaluator.duration_list
+        capacity = self.evaluator.capacity_list
+        total_slots = self.calendar.total_slots
+        genes = array('i', self.encode(state))
+        shift_count = [0] * (len(self.doctors) * self.evaluator.keys_per_doctor)
+        workload = [0] * len(self.doctors)
+        accepted = [0] * len(self.doctors)
+        owner = [-1] * total_slots
+        placed = [None] * len(genes)
+        used = score = present = total = total_sq = 0
+
+        def fitness_with(duration, move):
+            if move is None:
+                return score - variance_from_sums(present, total, total_sq) * 0.5
+            doc_idx = move[3]
+            before = workload[doc_idx]
+            after = before + duration
+            imbalance = variance_from_sums(present + (accepted[doc_idx] == 0), total + duration,
+                                           total_sq + after * after - before * before)
+            return score + move[4] - imbalance * 0.5
+
+        def place(i, move, sign=1):
+            nonlocal used, score, present, total, total_sq
+            gene, key, mask, doc_idx, gain = move
+            duration = durations[i]
+            used ^= mask
+            slot_int = gene % total_slots
+            for s in range(slot_int, slot_int + max(duration, 0)):
+                owner[s] = i if sign > 0 else -1
+            shift_count[key] += sign
+            before = workload[doc_idx]
+            workload[doc_idx] = after = before + sign * duration
+            if accepted[doc_idx] == 0:
+                present += 1
+            accepted[doc_idx] += sign
+            if accepted[doc_idx] == 0:
+                present -= 1
+            score += sign * gain
+            total += after - before
+            total_sq += after * after - before * before
+            genes[i] = gene if sign > 0 else -1
+            placed[i] = move if sign > 0 else None
+
+        def fits(move):
+            return not used & move[2] and shift_count[move[1]] < capacity[move[1]]
+
+        def best_move(i, current):
+            duration = durations[i]
+            best, best_value = current, fitness_with(duration, current)
+            for move in move_table[i]:
+                if move is not current and not used & move[2] and shift_count[move[1]] < capacity[move[1]]:
+                    value = fitness_with(duration, move)
+                    if value > best_value + 1e-9:
+                        best, best_value = move, value
+            return best
+
+        # Repair: earlier genes keep their place, a later gene in the way has to move
+        for i, gene in enumerate(genes):
+            if gene < 0:
+                continue
+            genes[i] = -1
+            move = move_index[i].get(gene)
+            if move is None or not fits(move):
+                if movable is not None and i not in movable:
+                    genes[i] = gene
+                    continue
+                move = best_move(i, None)
+            if move is not None:
+                place(i, move)
+
+        # Local search: relocate or insert each patient, else swap with the owner of a candidate slot.
+        # Swapping keeps the slot bonuses, so it only pays off between doctors and different durations.
+        for _ in range(passes):
+            improved = False
+            for i in (range(len(genes)) if movable is None else sorted(movable)):
+                current = placed[i]
+                if current is not None:
+                    place(i, current, -1)
+                move = best_move(i, current)
+                if move is not None:
+                    place(i, move)
+                if move is not current:
+                    improved = True
                     continue
-        
-        # Add rows and populate data
-        if schedule_data:
-            self.AppendRows(len(schedule_data))
-            for row, data in enumerate(schedule_data):
-                for col, value in enumerate(data):
-                    self.SetCellValue(row, col, value)
-                    self.SetCellAlignment(row, col, wx.ALIGN_CENTER, wx.ALIGN_CENTER)
-
-class DoctorWorkloadPanel(scrolled.ScrolledPanel):
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.SetupScrolling()
-        
-        self.sizer = wx.BoxSizer(wx.VERTICAL)
-        self.SetSizer(self.sizer)
-        
-    def update_workload(self, result, doctors, patients):
-        # Clear existing content
-        self.sizer.Clear(True)
-        
-        # Calculate doctor shifts
-        doctor_shifts = {}
-        for i, assign in enumerate(result.state):
-            if assign and i < len(patients):
-                slot, doctor = assign
-                patient = patients[i]
-                try:
-                    slot_int = int(slot)
-                    shift_key = get_shift_key(slot_int)
-                    
-                    if doctor not in doctor_shifts:
-                        doctor_shifts[doctor] = {}
-                    if shift_key not in doctor_shifts[doctor]:
-                        doctor_shifts[doctor][shift_key] = []
-                        
-                    doctor_shifts[doctor][shift_key].append(f"BN{patient.get('id', i+1)}")
-                except Exception:
+                if move is None:
                     continue
-        
-        # Create workload display
-        title = wx.StaticText(self, label=f"TỔNG KẾT CÔNG VIỆC CÁC BÁC SĨ (Giới hạn: {MAX_PATIENTS_PER_SHIFT} BN/buổi)")
-        title.SetFont(wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
-        self.sizer.Add(title, 0, wx.ALL, 10)
-        
-        for doctor in doctors:
-            doctor_name = doctor['name']
-            
-            # Doctor name
-            doctor_label = wx.StaticText(self, label=f"Bác sĩ {doctor_name}:")
-            doctor_label.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
-            self.sizer.Add(doctor_label, 0, wx.LEFT, 20)
-            
-            # Off shift info
-            if doctor.get('off_shifts'):
-                off_day_idx, off_shift_idx, _ = doctor['off_shifts'][0]
-                off_day = DAYS[off_day_idx]
-                off_shift = SHIFTS[off_shift_idx]
-                off_text = wx.StaticText(self, label=f"  Nghỉ: {off_day} ({off_shift})")
-                self.sizer.Add(off_text, 0, wx.LEFT, 40)
-            
-            # Work schedule
-            total_patients = 0
-            for day_idx in range(len(DAYS)):
-                for shift_idx in range(len(SHIFTS)):
-                    shift_key = (day_idx, shift_idx)
-                    day_name = DAYS[day_idx]
-                    shift_name = SHIFTS[shift_idx]
-                    
-                    if not is_doctor_working(doctor, day_idx, shift_idx):
+
+                base = fitness_with(0, None)
+                for candidate in move_table[i]:
+                    j = owner[candidate[0] % total_slots]
+                    other = placed[j] if j >= 0 else None
+                    if (other is None or j == i or other[0] != candidate[0] or other[3] == current[3]
+                            or durations[j] == durations[i] or (movable is not None and j not in movable)):
                         continue
-                        
-                    if doctor_name in doctor_shifts and shift_key in doctor_shifts[doctor_name]:
-                        patients_list = doctor_shifts[doctor_name][shift_key]
-                        count = len(patients_list)
-                        total_patients += count
-                        status = "⚠️ VƯỢT" if count > MAX_PATIENTS_PER_SHIFT else "✅ OK"
-                        
-                        shift_text = wx.StaticText(self, 
-                            label=f"  {day_name} ({shift_name}): {count}/{MAX_PATIENTS_PER_SHIFT} BN {status} - {', '.join(patients_list)}")
-                        
-                        if count > MAX_PATIENTS_PER_SHIFT:
-                            shift_text.SetForegroundColour(wx.Colour(255, 0, 0))  # Red
-                        
-                        self.sizer.Add(shift_text, 0, wx.LEFT, 40)
-                    else:
-                        shift_text = wx.StaticText(self, 
-                            label=f"  {day_name} ({shift_name}): 0/{MAX_PATIENTS_PER_SHIFT} BN ✅ OK - Rảnh")
-                        shift_text.SetForegroundColour(wx.Colour(0, 128, 0))  # Green
-                        self.sizer.Add(shift_text, 0, wx.LEFT, 40)
-            
-            # Total
-            total_text = wx.StaticText(self, label=f"  → Tổng: {total_patients} bệnh nhân")
-            total_text.SetFont(wx.Font(9, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_ITALIC, wx.FONTWEIGHT_NORMAL))
-            self.sizer.Add(total_text, 0, wx.LEFT, 40)
-            
-            self.sizer.Add(wx.StaticLine(self), 0, wx.EXPAND | wx.ALL, 5)
-        
-        self.Layout()
-        self.SetupScrolling()
-
-class MainFrame(wx.Frame):
-    def __init__(self):
-        super().__init__(parent=None, title="Hệ thống lập lịch khám bệnh", size=(1000, 700))
-        
-        self.doctors = []
-        self.patients = []
-        self.result = None
-        
-        self.create_menu()
-        self.create_ui()
-        self.create_status_bar()
-        
-        self.Center()
-
-    def create_menu(self):
-        menubar = wx.MenuBar()
-        
-        # File menu
-        file_menu = wx.Menu()
-        load_item = file_menu.Append(wx.ID_OPEN, "&Tải dữ liệu\tCtrl+O", "Tải dữ liệu từ file JSON")
-        run_item = file_menu.Append(wx.ID_ANY, "&Chạy thuật toán\tCtrl+R", "Chạy thuật toán tối ưu")
-        file_menu.AppendSeparator()
-        exit_item = file_menu.Append(wx.ID_EXIT, "&Thoát\tCtrl+Q", "Thoát chương trình")
-        
-        menubar.Append(file_menu, "&File")
-        
-        # Bind events
-        self.Bind(wx.EVT_MENU, self.on_load_data, load_item)
-        self.Bind(wx.EVT_MENU, self.on_run_algorithm, run_item)
-        self.Bind(wx.EVT_MENU, self.on_exit, exit_item)
-        
-        self.SetMenuBar(menubar)
-
-    def create_ui(self):
-        panel = wx.Panel(self)
-        main_sizer = wx.BoxSizer(wx.VERTICAL)
-        
-        # Control panel
-        control_panel = wx.Panel(panel)
-        control_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        
-        self.load_btn = wx.Button(control_panel, label="Tải dữ liệu")
-        self.run_btn = wx.Button(control_panel, label="Chạy thuật toán")
-        self.run_btn.Enable(False)
-        
-        control_sizer.Add(self.load_btn, 0, wx.ALL, 5)
-        control_sizer.Add(self.run_btn, 0, wx.ALL, 5)
-        
-        # Progress bar
-        self.progress = wx.Gauge(control_panel, range=100)
-        control_sizer.Add(self.progress, 1, wx.ALL | wx.EXPAND, 5)
-        
-        control_panel.SetSizer(control_sizer)
-        
-        # Notebook for tabs
-        self.notebook = wx.Notebook(panel)
-        
-        # Schedule tab
-        schedule_panel = wx.Panel(self.notebook)
-        schedule_sizer = wx.BoxSizer(wx.VERTICAL)
-        
-        self.schedule_grid = ScheduleGrid(schedule_panel)
-        schedule_sizer.Add(self.schedule_grid, 1, wx.EXPAND | wx.ALL, 5)
-        
-        schedule_panel.SetSizer(schedule_sizer)
-        self.notebook.AddPage(schedule_panel, "Lịch khám")
-        
-        # Workload tab
-        self.workload_panel = DoctorWorkloadPanel(self.notebook)
-        self.notebook.AddPage(self.workload_panel, "Công việc bác sĩ")
-        
-        # Summary tab
-        summary_panel = wx.Panel(self.notebook)
-        summary_sizer = wx.BoxSizer(wx.VERTICAL)
-        
-        self.summary_text = wx.TextCtrl(summary_panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
-        summary_sizer.Add(self.summary_text, 1, wx.EXPAND | wx.ALL, 5)
-        
-        summary_panel.SetSizer(summary_sizer)
-        self.notebook.AddPage(summary_panel, "Tóm tắt")
-        
-        # Add to main sizer
-        main_sizer.Add(control_panel, 0, wx.EXPAND | wx.ALL, 5)
-        main_sizer.Add(self.notebook, 1, wx.EXPAND | wx.ALL, 5)
-        
-        panel.SetSizer(main_sizer)
-        
-        # Bind events
-        self.load_btn.Bind(wx.EVT_BUTTON, self.on_load_data)
-        self.run_btn.Bind(wx.EVT_BUTTON, self.on_run_algorithm)
-
-    def create_status_bar(self):
-        self.statusbar = self.CreateStatusBar()
-        self.statusbar.SetStatusText("Sẵn sàng")
-
-    def on_load_data(self, event):
-        try:
-            # Check if files exist
-            if not os.path.exists('doctor.json') or not os.path.exists('patin.json'):
-                wx.MessageBox("Không tìm thấy file doctor.json hoặc patin.json", 
-                             "Lỗi", wx.OK | wx.ICON_ERROR)
-                return
-            
-            with open('doctor.json', 'r', encoding='utf-8') as f:
-                self.doctors = json.load(f)
-            with open('patin.json', 'r', encoding='utf-8') as f:
-                self.patients = json.load(f)
-            
-            # Generate doctor schedules
-            generate_doctor_schedule(self.doctors)
-            
-            self.run_btn.Enable(True)
-            self.statusbar.SetStatusText(f"Đã tải {len(self.doctors)} bác sĩ và {len(self.patients)} bệnh nhân")
-            
-            # Update summary
-            summary = f"=== THÔNG TIN DỮ LIỆU ===\n"
-            summary += f"Số bác sĩ: {len(self.doctors)}\n"
-            summary += f"Số bệnh nhân: {len(self.patients)}\n\n"
-            summary += "=== LỊCH NGHỈ CÁC BÁC SĨ ===\n"
-            
-            for doctor in self.doctors:
-                if doctor.get('off_shifts'):
-                    off_day_idx, off_shift_idx, _ = doctor['off_shifts'][0]
-                    off_day_name = DAYS[off_day_idx]
-                    off_shift_name = SHIFTS[off_shift_idx]
-                    summary += f"Bác sĩ {doctor['name']} nghỉ: {off_day_name} ({off_shift_name})\n"
-            
-            self.summary_text.SetValue(summary)
-            
-        except Exception as e:
-            wx.MessageBox(f"Lỗi khi tải dữ liệu: {str(e)}", "Lỗi", wx.OK | wx.ICON_ERROR)
-
-    def on_run_algorithm(self, event):
-        if not self.doctors or not self.patients:
-            wx.MessageBox("Vui lòng tải dữ liệu trước", "Thông báo", wx.OK | wx.ICON_WARNING)
+                    back = move_index[j].get(current[0])
+                    if back is None:
+                        continue
+                    place(i, current, -1)
+                    place(j, other, -1)
+                    if fits(candidate):
+                        place(i, candidate)
+                        if fits(back):
+                            place(j, back)
+                            if fitness_with(0, None) > base + 1e-9:
+                                improved = True
+                                break
+                            place(j, back, -1)
+                        place(i, candidate, -1)
+                    place(j, other)
+                    place(i, current)
+            if not improved:
+                break
+
+        return self.track(genes) if self.incremental else genes
+
+    def gene_key(self, gene):
+        if gene < 0:
+            return -1
+        doc_idx, slot_int = divmod(gene, self.calendar.total_slots)
+        return doc_idx * self.evaluator.keys_per_doctor + self.evaluator.slot_keys[slot_int]
+
+    def crossover(self, s1, s2):
+        if not s1 or not s2:
+            return s1 or s2 or array('i')
+
+        s1, s2 = self.encode(s1), self.encode(s2)
+        cut = random.randint(1, len(s1) - 1) if len(s1) > 1 else 1
+        child = s1[:cut] + s2[cut:]
+        return self.track(child) if self.incremental else child
+
+    def mutate_tracked(self, state):
+        new_state = state.copy()
+        for _ in range(10):
+            idx = self.mutation_index(len(state))
+            choices = self.candidates.choices[idx]
+            if not choices:
+                continue
+
+            current_key = new_state.key_of[idx]
+            counts = new_state.counts
+            capacity = self.evaluator.capacity_list
+            valid_combinations = [gene for gene, key in zip(choices, self.candidates.key_ids[idx])
+                                  if counts[key] - (key == current_key) < capacity[key]]
+
+            if valid_combinations:
+                new_state.assign(idx, random.choice(valid_combinations))
+                return new_state
+
+        return new_state
+
+# -------------------- AVAILABILITY INDEX --------------------
+class AvailabilityIndex:
+    def __init__(self, doctors=(), calendar=DEFAULT_CALENDAR):
+        self.calendar = calendar
+        self.reset(doctors)
+
+    def reset(self, doctors=(), calendar=None):
+        # One total_slots-bit mask of free slots per doctor, rebuilt on every load
+        self.calendar = calendar or self.calendar
+        self.masks = []
+        self.by_name = {}
+        for doc_idx, doc in enumerate(doctors):
+            self.masks.append(self.calendar.free_mask(doc))
+            self.by_name.setdefault(doc.get('name'), []).append(doc_idx)
+
+    def is_free(self, doc_idx, slot_int):
+        return bool(self.masks[doc_idx] >> slot_int & 1)
+
+    def doctor_mask(self, name):
+        mask = 0
+        for doc_idx in self.by_name.get(name, []):
+            mask |= self.masks[doc_idx]
+        return mask
+
+    # Same answers as the former kanren relation available_slot(name, slot)
+    def is_available(self, name, slot):
+        slot_int = parse_slot_label(str(slot), self.calendar.total_slots)
+        return slot_int is not None and bool(self.doctor_mask(name) >> slot_int & 1)
+
+    def available_slots(self, name):
+        mask = self.doctor_mask(name)
+        return tuple(str(start) for start, end in self.calendar.mask_ranges(mask) for start in range(start, end))
+
+    def doctors_available(self, slot):
+        slot_int = parse_slot_label(str(slot), self.calendar.total_slots)
+        if slot_int is None:
+            return ()
+        return tuple(name for name in self.by_name if self.doctor_mask(name) >> slot_int & 1)
+
+    def free_matrix(self):
+        total_slots = self.calendar.total_slots
+        n_bytes = (total_slots + 7) // 8
+        packed = np.frombuffer(b''.join(mask.to_bytes(n_bytes, 'little') for mask in self.masks),
+                               dtype=np.uint8).reshape(len(self.masks), n_bytes)
+        return np.unpackbits(packed, axis=1, bitorder='little')[:, :total_slots].astype(bool)
+
+# -------------------- CANDIDATE INDEX --------------------
+def patient_free_slots(patients, total_slots):
+    # (specialty, free slot ids) per patient; snapshots hand out their bitsets already decoded
+    if isinstance(patients, SnapshotPatients):
+        yield from zip(patients.specialty_names(), patients.iter_slots())
+        return
+    for patient in patients:
+        slots = []
+        for slot in patient.get('free_slots', []):
+            slot_int = parse_slot_label(str(slot), total_slots)
+            if slot_int is not None:
+                slots.append(slot_int)
+        yield patient.get('specialty'), slots
+
+class CandidateIndex:
+    def __init__(self, doctors, patients, availability, calendar=DEFAULT_CALENDAR):
+        n_shifts = calendar.n_shifts
+        total_slots = calendar.total_slots
+        keys_per_doctor = calendar.keys_per_doctor
+        slot_keys = np.array(calendar.slot_keys(), dtype=np.int64)
+        doctor_index = build_doctor_index(doctors)
+        canonical = np.array([doctor_index[doc.get('name')] for doc in doctors], dtype=np.int32)
+
+        # usable[d, s]: slot s is free for doctor d and not inside one of the doctor's off shifts
+        usable = availability.free_matrix() if doctors else np.zeros((0, total_slots), dtype=bool)
+        for doc_idx, doc in enumerate(doctors):
+            for off in doc.get('off_shifts', []):
+                if 0 <= off[0] < calendar.n_days and 0 <= off[1] < n_shifts:
+                    start, end = calendar.shift_range(off[0], off[1])
+                    usable[doc_idx, start:end] = False
+        by_specialty = {}
+        for doc_idx, doc in enumerate(doctors):
+            by_specialty.setdefault(doc.get('specialty'), []).append(doc_idx)
+        by_specialty = {specialty: (np.array(indices), usable[indices])
+                        for specialty, indices in by_specialty.items()}
+
+        # Per patient: packed genes to sample from and their flat (doctor, day, shift) key ids, in the
+        # order the original filters produced
+        self.choices = []
+        self.key_ids = []
+        for specialty, slots in patient_free_slots(patients, total_slots):
+            if len(slots) and specialty in by_specialty:
+                doc_indices, doc_usable = by_specialty[specialty]
+                slots = np.array(slots)
+                slot_pos, doc_pos = np.nonzero(doc_usable[:, slots].T)
+                pairs = np.stack([slots[slot_pos], canonical[doc_indices[doc_pos]]], axis=1).astype(np.int32)
+            else:
+                pairs = np.zeros((0, 2), dtype=np.int32)
+            self.choices.append((pairs[:, 1] * total_slots + pairs[:, 0]).tolist())
+            self.key_ids.append((pairs[:, 1] * keys_per_doctor + slot_keys[pairs[:, 0]]).tolist())
+
+# -------------------- BATCHED FITNESS --------------------
+class PopulationEvaluator:
+    def __init__(self, doctors, patients, availability=None, calendar=DEFAULT_CALENDAR):
+        self.doctors = doctors
+        self.patients = patients
+        self.calendar = calendar
+        self.total_slots = total_slots = calendar.total_slots
+        self.n_days = calendar.n_days
+        self.n_shifts = calendar.n_shifts
+        self.keys_per_doctor = calendar.keys_per_doctor
+
+        self.doctor_index = build_doctor_index(doctors)
+        self.slot_keys = calendar.slot_keys()
+        self.slot_key_array = np.array(self.slot_keys, dtype=np.int64)
+
+        n_doctors = len(doctors)
+        availability = availability or AvailabilityIndex(doctors, calendar)
+        free = np.zeros((n_doctors, total_slots + 1), dtype=bool)
+        free[:, :total_slots] = availability.free_matrix()
+        self.working = np.ones((n_doctors, self.n_days, self.n_shifts), dtype=bool)
+        for doc_idx, doc in enumerate(doctors):
+            for off_day_idx, off_shift_idx, _ in doc.get('off_shifts', []):
+                if 0 <= off_day_idx < self.n_days and 0 <= off_shift_idx < self.n_shifts:
+                    self.working[doc_idx, off_day_idx, off_shift_idx] = False
+
+        # free_run[d, s] = number of consecutive free slots of doctor d starting at s
+        self.free_run = np.zeros((n_doctors, total_slots + 1), dtype=np.int32)
+        for slot_int in range(total_slots - 1, -1, -1):
+            self.free_run[:, slot_int] = np.where(free[:, slot_int], self.free_run[:, slot_int + 1] + 1, 0)
+
+        if isinstance(patients, SnapshotPatients):
+            self.durations = calendar.duration_slots(patients.durations.astype(np.int64))
+            self.priorities = patients.priorities.astype(np.int64)
+        else:
+            self.durations = np.array([calendar.duration_slots(p.get('duration', 15)) for p in patients],
+                                      dtype=np.int64)
+            self.priorities = np.array([p.get('priority', 1) for p in patients])
+        # Shift capacity per (doctor, day, shift) key, laid out like the flat shift counts
+        limits = [doc.get('max_patients_per_shift', MAX_PATIENTS_PER_SHIFT) for doc in doctors]
+        self.capacity = np.repeat(np.array(limits, dtype=np.int64), self.keys_per_doctor)
+        # Bit masks of the slots a patient occupies, shifted to the start slot when used
+        self.span_masks = [(1 << max(int(duration), 0)) - 1 for duration in self.durations]
+
+        # Plain-list views for the scalar value() path
+        self.duration_list = self.durations.tolist()
+        self.priority_list = self.priorities.tolist()
+        self.free_run_list = self.free_run.tolist()
+        self.working_list = self.working.reshape(n_doctors, self.n_days * self.n_shifts).tolist()
+        self.capacity_list = self.capacity.tolist()
+
+    def encode_state(self, state):
+        if isinstance(state, array) and len(state) == len(self.patients):
+            return np.frombuffer(state, dtype=np.int32)
+        return np.frombuffer(encode_state(state, self.doctors, len(self.patients), self.doctor_index,
+                                          self.total_slots), dtype=np.int32)
+
+    def encode_population(self, states):
+        population = np.full((len(states), len(self.patients)), -1, dtype=np.int32)
+        for row, state in enumerate(states):
+            if state:
+                population[row] = self.encode_state(state)
+        return population
+
+    def evaluate(self, population):
+        population = np.asarray(population, dtype=np.int64)
+        n_states, n_patients = population.shape
+        if n_states == 0 or n_patients == 0 or not self.doctors:
+            return np.zeros(n_states)
+
+        rows = np.arange(n_states)
+        assigned = population >= 0
+        total_slots = self.total_slots
+        slots = np.where(assigned, population % total_slots, 0)
+        docs = np.where(assigned, population // total_slots, 0)
+        slot_keys = self.slot_key_array[slots]
+
+        # Per-(doctor, day, shift) counts over every assigned gene, like count_patients_per_shift
+        keys = docs * self.keys_per_doctor + slot_keys
+        n_keys = len(self.doctors) * self.keys_per_doctor
+        flat_keys = (rows[:, None] * n_keys + keys)[assigned]
+        counts = np.bincount(flat_keys, minlength=n_states * n_keys).reshape(n_states, n_keys)
+        gene_counts = np.take_along_axis(counts, keys, axis=1)
+
+        durations = self.durations[None, :]
+        eligible = (assigned
+                    & (slots + durations <= total_slots)
+                    & (self.free_run[docs, slots] >= durations)
+                    & self.working.reshape(len(self.doctors), self.n_days * self.n_shifts)[docs, slot_keys])
+        over_capacity = gene_counts > self.capacity[keys]
+
+        # Slot conflicts depend on earlier accepted genes, so walk the genes in order
+        occupied = np.zeros((n_states, total_slots), dtype=bool)
+        accepted = np.zeros_like(eligible)
+        penalized = np.zeros_like(eligible)
+        for i in np.flatnonzero(eligible.any(axis=0)):
+            candidates = rows[eligible[:, i]]
+            duration = int(self.durations[i])
+            if duration:
+                span = slots[candidates, i][:, None] + np.arange(duration)
+                clear = ~occupied[candidates[:, None], span].any(axis=1)
+                candidates, span = candidates[clear], span[clear]
+                placed = ~over_capacity[candidates, i]
+                occupied[candidates[placed][:, None], span[placed]] = True
+            else:
+                placed = ~over_capacity[candidates, i]
+            accepted[candidates[placed], i] = True
+            penalized[candidates[~placed], i] = True
+
+        gains = self.priorities[None, :] * 10 + np.maximum(0, 100 - slots) + 50
+        score = np.where(accepted, gains, 0).sum(axis=1) - 1000 * penalized.sum(axis=1)
+
+        flat_docs = (rows[:, None] * len(self.doctors) + docs)[accepted]
+        minlength = n_states * len(self.doctors)
+        workload = np.bincount(flat_docs, weights=np.broadcast_to(durations, accepted.shape)[accepted],
+                               minlength=minlength).reshape(n_states, -1).astype(np.int64)
+        present = np.bincount(flat_docs, minlength=minlength).reshape(n_states, -1) > 0
+        n = present.sum(axis=1)
+        total = workload.sum(axis=1)
+        total_sq = (workload * workload).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            imbalance = np.where(n > 1, (n * total_sq - total * total) / (n * n), 0)
+
+        return score - (imbalance * 0.5)
+
+# -------------------- FITNESS CACHE --------------------
+class FitnessCache:
+    def __init__(self, maxsize=FITNESS_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError(f"Invalid cache size: {maxsize}")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, encoded_state):
+        return hashlib.blake2b(np.ascontiguousarray(encoded_state).tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def peek(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, score):
+        self.entries[key] = score
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+def combined_cache_stats(stats):
+    # Lookups of the fitness caches of several problems (islands, specialty groups) added up
+    stats = [item for item in stats if item]
+    if not stats:
+        return None
+    hits, misses = sum(item['hits'] for item in stats), sum(item['misses'] for item in stats)
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
+
+# -------------------- INCREMENTAL STATE --------------------
+class SharedList:
+    # Fixed-length list stored in chunks of 2**SHARED_CHUNK_BITS entries. copy() only copies the
+    # chunk references, and a chunk is copied when a list that shares it writes to it.
+    __slots__ = ('chunks', 'owned', 'length')
+
+    def __init__(self, values):
+        size = 1 << SHARED_CHUNK_BITS
+        self.chunks = [values[start:start + size] for start in range(0, len(values), size)]
+        self.owned = set(range(len(self.chunks)))
+        self.length = len(values)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.chunks[index >> SHARED_CHUNK_BITS][index & SHARED_CHUNK_MASK]
+
+    def __setitem__(self, index, value):
+        chunk = index >> SHARED_CHUNK_BITS
+        if chunk not in self.owned:
+            self.chunks[chunk] = self.chunks[chunk][:]
+            self.owned.add(chunk)
+        self.chunks[chunk][index & SHARED_CHUNK_MASK] = value
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.chunks)
+
+    def copy(self):
+        clone = object.__new__(SharedList)
+        clone.chunks = self.chunks[:]
+        clone.length = self.length
+        self.owned, clone.owned = set(), set()
+        return clone
+
+SHARED_FIELDS = ('slot_of', 'doc_of', 'key_of', 'eligible', 'status', 'owner', 'cover', 'members')
+
+class TrackedSchedule:
+    def __init__(self, problem, state):
+        evaluator = problem.evaluator
+        self.problem = problem
+        self.genes = array('i', state)
+        n_patients = len(problem.patients)
+        n_keys = len(problem.doctors) * evaluator.keys_per_doctor
+
+        self.slot_of = [-1] * n_patients
+        self.doc_of = [-1] * n_patients
+        self.key_of = [-1] * n_patients
+        self.eligible = [False] * n_patients
+        self.status = [0] * n_patients
+        self.counts = [0] * n_keys
+        self.owner = [-1] * evaluator.total_slots
+        # Eligible genes covering each slot and assigned genes per (doctor, day, shift),
+        # shared between copies until one of them writes
+        self.cover = [set() for _ in range(evaluator.total_slots)]
+        self.members = [set() for _ in range(n_keys)]
+        self.own_cover = set(range(evaluator.total_slots))
+        self.own_members = set(range(n_keys))
+        self.workload = [0] * len(problem.doctors)
+        self.accepted_per_doctor = [0] * len(problem.doctors)
+        self.n_present = 0
+        self.total = 0
+        self.total_sq = 0
+        self.score = 0
+
+        for i, gene in enumerate(self.genes[:n_patients]):
+            self._attach(i, gene)
+        # Earlier genes always win, so one ordered pass needs no re-evaluation
+        for i in range(n_patients):
+            self._set_status(i, self._compute_status(i), None)
+        # Built as plain lists; long ones are shared from here on so copy() does not grow with the roster
+        for name in SHARED_FIELDS:
+            if len(getattr(self, name)) >= SHARED_MIN_LENGTH:
+                setattr(self, name, SharedList(getattr(self, name)))
+
+    def __len__(self):
+        return len(self.genes)
+
+    def __getitem__(self, index):
+        return self.genes[index]
+
+    def __iter__(self):
+        return iter(self.genes)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    @property
+    def fitness(self):
+        imbalance = variance_from_sums(self.n_present, self.total, self.total_sq)
+        return self.score - (imbalance * 0.5)
+
+    def copy(self):
+        # The genes (one array copy), the per-doctor lists, including the shift counts that mutate
+        # reads for every candidate, and short lists are copied whole; a SharedList costs one
+        # reference per chunk
+        clone = object.__new__(TrackedSchedule)
+        clone.__dict__.update(self.__dict__)
+        for name in SHARED_FIELDS:
+            setattr(clone, name, getattr(self, name).copy())
+        for name in ('genes', 'counts', 'workload', 'accepted_per_doctor'):
+            setattr(clone, name, getattr(self, name)[:])
+        self.own_cover, self.own_members = set(), set()
+        clone.own_cover, clone.own_members = set(), set()
+        return clone
+
+    def assign(self, idx, gene):
+        gene = encode_gene(gene, self.problem.evaluator.doctor_index, self.problem.evaluator.total_slots)
+        queue, queued = [], set()
+
+        self._set_status(idx, 0, (queue, queued))
+        old_key = self._detach(idx)
+        self.genes[idx] = gene
+        new_key = self._attach(idx, gene)
+
+        # Crossing the shift cap flips every gene of that shift between accepted and penalized
+        capacity = self.problem.evaluator.capacity_list
+        if old_key >= 0 and self.counts[old_key] == capacity[old_key]:
+            self._push_all(self.members[old_key], queue, queued)
+        if new_key >= 0 and self.counts[new_key] == capacity[new_key] + 1:
+            self._push_all(self.members[new_key], queue, queued)
+        self._push(idx, queue, queued)
+
+        while queue:
+            j = heapq.heappop(queue)
+            queued.discard(j)
+            self._set_status(j, self._compute_status(j), (queue, queued))
+
+    def _writable_cover(self, slot_int):
+        if slot_int not in self.own_cover:
+            self.cover[slot_int] = set(self.cover[slot_int])
+            self.own_cover.add(slot_int)
+        return self.cover[slot_int]
+
+    def _writable_members(self, key):
+        if key not in self.own_members:
+            self.members[key] = set(self.members[key])
+            self.own_members.add(key)
+        return self.members[key]
+
+    def _attach(self, i, gene):
+        evaluator = self.problem.evaluator
+        if i >= len(self.slot_of) or gene < 0:
+            return -1
+        doc_idx, slot_int = divmod(gene, evaluator.total_slots)
+        slot_key = evaluator.slot_keys[slot_int]
+        key = doc_idx * evaluator.keys_per_doctor + slot_key
+        duration = evaluator.duration_list[i]
+        self.slot_of[i], self.doc_of[i], self.key_of[i] = slot_int, doc_idx, key
+        self.eligible[i] = bool(slot_int + duration <= evaluator.total_slots
+                                and evaluator.free_run_list[doc_idx][slot_int] >= duration
+                                and evaluator.working_list[doc_idx][slot_key])
+        self.counts[key] += 1
+        self._writable_members(key).add(i)
+        if self.eligible[i]:
+            for s in range(slot_int, slot_int + duration):
+                self._writable_cover(s).add(i)
+        return key
+
+    def _detach(self, i):
+        key = self.key_of[i]
+        if key < 0:
+            return -1
+        if self.eligible[i]:
+            slot_int = self.slot_of[i]
+            for s in range(slot_int, slot_int + int(self.problem.evaluator.durations[i])):
+                self._writable_cover(s).discard(i)
+        self.counts[key] -= 1
+        self._writable_members(key).discard(i)
+        self.slot_of[i] = self.doc_of[i] = self.key_of[i] = -1
+        self.eligible[i] = False
+        return key
+
+    def _compute_status(self, i):
+        if not self.eligible[i]:
+            return 0
+        slot_int = self.slot_of[i]
+        for s in range(slot_int, slot_int + int(self.problem.evaluator.durations[i])):
+            if 0 <= self.owner[s] < i:
+                return 0
+        key = self.key_of[i]
+        return 2 if self.counts[key] > self.problem.evaluator.capacity_list[key] else 1
+
+    def _set_status(self, i, status, pending):
+        previous = self.status[i]
+        if previous == status:
+            return
+        evaluator = self.problem.evaluator
+        duration = int(evaluator.durations[i])
+        slot_int = self.slot_of[i]
+
+        if previous == 1:
+            for s in range(slot_int, slot_int + duration):
+                if self.owner[s] == i:
+                    self.owner[s] = -1
+                    if pending:
+                        self._push_all([j for j in self.cover[s] if j > i], *pending)
+            self._add_workload(self.doc_of[i], -duration, -1)
+            self.score -= self._gain(i)
+        elif previous == 2:
+            self.score += 1000
+
+        if status == 1:
+            for s in range(slot_int, slot_int + duration):
+                # Later genes on these slots, accepted or penalized, now conflict
+                if pending:
+                    self._push_all([j for j in self.cover[s] if j > i], *pending)
+                self.owner[s] = i
+            self._add_workload(self.doc_of[i], duration, 1)
+            self.score += self._gain(i)
+        elif status == 2:
+            self.score -= 1000
+        self.status[i] = status
+
+    def _gain(self, i):
+        priority = self.problem.evaluator.priorities[i].item()
+        return priority * 10 + max(0, 100 - self.slot_of[i]) + 50
+
+    def _add_workload(self, doc_idx, duration, accepted):
+        before = self.workload[doc_idx]
+        after = before + duration
+        count = self.accepted_per_doctor[doc_idx]
+        if count == 0:
+            self.n_present += 1
+        elif count + accepted == 0:
+            self.n_present -= 1
+        self.accepted_per_doctor[doc_idx] = count + accepted
+        self.workload[doc_idx] = after
+        self.total += after - before
+        self.total_sq += after * after - before * before
+
+    def _push(self, i, queue, queued):
+        if i not in queued:
+            queued.add(i)
+            heapq.heappush(queue, i)
+
+    def _push_all(self, indices, queue, queued):
+        for i in indices:
+            self._push(i, queue, queued)
+
+# -------------------- PROFILING --------------------
+PROFILED_PROBLEM_METHODS = ('generate_random_state', 'generate_greedy_state', 'evaluate_population', 'value',
+                            'compute_value', 'crossover', 'mutate', 'repair', 'shift_counts')
+PROFILED_SOLVER_METHODS = ('select', 'step')
+
+def population_diversity(population):
+    # Mean share of distinct alleles per gene: 0 = all individuals identical, 1 = all different
+    population = np.asarray(population)
+    if population.ndim != 2 or len(population) < 2 or population.shape[1] == 0:
+        return 0.0
+    distinct = (np.diff(np.sort(population, axis=0), axis=0) != 0).sum(axis=0)
+    return float(distinct.mean() / (len(population) - 1))
+
+class SolverProfiler:
+    def __init__(self, trace=True):
+        self.started = time.perf_counter()
+        self.calls = {}
+        self.generations = []
+        self.events = [] if trace else None
+        self.originals = []
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter() - start)
+        return timed
+
+    def record(self, name, start, duration):
+        stats = self.calls.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
+        if self.events is not None:
+            self.events.append((name, start - self.started, duration))
+
+    # Timing wrappers live on the instances only while attached, so a solver
+    # without a profiler runs the plain methods with no extra checks
+    def attach(self, solver):
+        for obj, names in ((solver.problem, PROFILED_PROBLEM_METHODS), (solver, PROFILED_SOLVER_METHODS)):
+            for name in names:
+                self.originals.append((obj, name, name in obj.__dict__, obj.__dict__.get(name)))
+                setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def detach(self):
+        while self.originals:
+            obj, name, had_own, original = self.originals.pop()
+            if had_own:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+
+    def record_generation(self, generation, best, mean, diversity=None):
+        self.generations.append({'generation': generation, 'elapsed': time.perf_counter() - self.started,
+                                 'best': best, 'mean': mean, 'diversity': diversity})
+
+    def summary(self):
+        return {name: {'calls': calls, 'total_seconds': total, 'mean_seconds': total / calls}
+                for name, (calls, total) in sorted(self.calls.items(), key=lambda item: -item[1][1])}
+
+    def write_json_lines(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.generations:
+                f.write(json.dumps(dict(record, type='generation')) + '\n')
+            for name, stats in self.summary().items():
+                f.write(json.dumps(dict(stats, type='operator', name=name)) + '\n')
+
+    def write_chrome_trace(self, path):
+        # Loadable in chrome://tracing or Perfetto; timestamps are microseconds
+        events = [{'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                   'ts': round(start * 1e6, 3), 'dur': round(duration * 1e6, 3)}
+                  for name, start, duration in self.events or []]
+        for record in self.generations:
+            args = {key: record[key] for key in ('best', 'mean', 'diversity') if record[key] is not None}
+            events.append({'name': 'fitness', 'ph': 'C', 'pid': os.getpid(), 'tid': 0,
+                           'ts': round(record['elapsed'] * 1e6, 3), 'args': args})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def write(self, path):
+        if path.endswith('.jsonl'):
+            self.write_json_lines(path)
+        else:
+            self.write_chrome_trace(path)
+
+# -------------------- GENETIC SOLVER --------------------
+class SolverResult:
+    def __init__(self, state, value, generations, finish_reason, history, cache_stats=None):
+        self.state = state
+        self.value = value
+        self.generations = generations
+        self.finish_reason = finish_reason
+        self.history = history
+        # FitnessCache.stats() of the problem after the run, None without a cache
+        self.cache_stats = cache_stats
+
+class GeneticSolver:
+    def __init__(self, problem, population_size=POPULATION_SIZE, mutation_chance=MUTATION_CHANCE,
+                 elite_size=ELITE_SIZE, tournament_size=TOURNAMENT_SIZE, greedy_fraction=GREEDY_SEED_FRACTION,
+                 memetic_rate=MEMETIC_RATE, profiler=None):
+        if population_size < 1:
+            raise ValueError(f"Invalid population size: {population_size}")
+        if not 0 <= greedy_fraction <= 1:
+            raise ValueError(f"Invalid greedy seed fraction: {greedy_fraction}")
+        if not 0 <= memetic_rate <= 1:
+            raise ValueError(f"Invalid memetic rate: {memetic_rate}")
+        self.problem = problem
+        self.profiler = profiler
+        self.population_size = population_size
+        self.greedy_fraction = greedy_fraction
+        self.memetic_rate = memetic_rate
+        self.mutation_chance = mutation_chance
+        self.elite_size = min(elite_size, population_size)
+        self.tournament_size = max(1, tournament_size)
+        self.population = []
+        self.fitness = np.zeros(0)
+        self.generation = 0
+
+    def initialize(self, population=None, deadline=None):
+        # Once the deadline (time.monotonic()) has passed no generation will run, so seeding stops
+        # as soon as there is one schedule to return and the population shrinks to what was built
+        population = list(population or [])[:self.population_size]
+        n_greedy = min(round(self.greedy_fraction * self.population_size), self.population_size - len(population))
+        for _ in range(n_greedy):
+            if population and deadline is not None and time.monotonic() >= deadline:
+                break
+            population.append(self.problem.generate_greedy_state())
+        while len(population) < self.population_size:
+            if population and deadline is not None and time.monotonic() >= deadline:
+                self.population_size = len(population)
+                self.elite_size = min(self.elite_size, self.population_size)
+                break
+            population.append(self.problem.generate_random_state())
+        self.population = population
+        self.fitness = self.problem.evaluate_population(population)
+        self.generation = 0
+
+    def resize(self, population_size):
+        # Shrinking keeps the fittest, growing adds random states
+        population_size = max(1, population_size)
+        if population_size < len(self.population):
+            keep = np.argsort(-self.fitness, kind='stable')[:population_size]
+            self.population = [self.population[idx] for idx in keep]
+            self.fitness = self.fitness[keep]
+        elif population_size > len(self.population):
+            newcomers = [self.problem.generate_random_state()
+                         for _ in range(population_size - len(self.population))]
+            self.population = self.population + newcomers
+            self.fitness = np.concatenate([self.fitness, self.problem.evaluate_population(newcomers)])
+        self.population_size = population_size
+        self.elite_size = min(self.elite_size, population_size)
+
+    def immigrate(self, count):
+        # Random states replace the worst individuals; the elite is never touched
+        count = min(count, len(self.population) - self.elite_size)
+        if count <= 0:
+            return
+        worst = np.argsort(self.fitness, kind='stable')[:count]
+        newcomers = [self.problem.generate_random_state() for _ in range(count)]
+        for idx, state in zip(worst, newcomers):
+            self.population[idx] = state
+        self.fitness[worst] = self.problem.evaluate_population(newcomers)
+
+    def best(self):
+        best_idx = int(np.argmax(self.fitness))
+        return self.population[best_idx], float(self.fitness[best_idx])
+
+    def select(self):
+        contenders = [random.randrange(len(self.population)) for _ in range(self.tournament_size)]
+        return self.population[max(contenders, key=lambda idx: self.fitness[idx])]
+
+    def step(self):
+        elite_idx = np.argsort(-self.fitness, kind='stable')[:self.elite_size]
+        children = []
+        for _ in range(self.population_size - len(elite_idx)):
+            child = self.problem.crossover(self.select(), self.select())
+            if random.random() < self.mutation_chance:
+                child = self.problem.mutate(child)
+            if self.memetic_rate and random.random() < self.memetic_rate:
+                child = self.problem.repair(child)
+            children.append(child)
+
+        self.population = [self.population[idx] for idx in elite_idx] + children
+        self.fitness = np.concatenate([self.fitness[elite_idx],
+                                       self.problem.evaluate_population(children)])
+        self.generation += 1
+
+    def run(self, iterations_limit=ITERATIONS_LIMIT, stagnation_limit=STAGNATION_LIMIT,
+            time_limit=None, callback=None, stop_event=None, on_best=None, controller=None, started=None):
+        # iterations_limit=None runs until stagnation, the time limit or stop_event. time_limit counts
+        # from started (default: now, before a missing population is built), so callers can include
+        # their own setup in it
+        started = time.monotonic() if started is None else started
+        if not self.population:
+            self.initialize()
+        best_state, best_value = self.best()
+        history = []
+        stagnant = 0
+        finish_reason = 'iterations_limit'
+        # With a controller (anytime run) a generation is only started if one as long as the last
+        # still ends within time_limit
+        expected = 0.0
+
+        while iterations_limit is None or self.generation < iterations_limit:
+            if stop_event is not None and stop_event.is_set():
+                finish_reason = 'cancelled'
+                break
+            if time_limit is not None and time.monotonic() - started + expected >= time_limit:
+                finish_reason = 'time_limit'
+                break
+            step_started = time.monotonic()
+            self.step()
+            if controller:
+                expected = time.monotonic() - step_started
+            state, value = self.best()
+            mean = float(np.mean(self.fitness))
+            history.append((value, mean))
+            if value > best_value:
+                best_state, best_value = state, value
+                stagnant = 0
+                if on_best:
+                    on_best(self.generation, best_state, best_value)
+            else:
+                stagnant += 1
+
+            if self.profiler:
+                diversity = population_diversity(self.problem.evaluator.encode_population(
+                    [self.problem.encode(state) for state in self.population]))
+                self.profiler.record_generation(self.generation, value, mean, diversity)
+            if callback:
+                callback(self.generation, best_value, mean)
+            if controller:
+                controller.update(self, best_value)
+
+            if stagnation_limit and stagnant >= stagnation_limit:
+                finish_reason = 'stagnation'
+                break
+
+        cache_stats = self.problem.cache.stats() if self.problem.cache else None
+        return SolverResult(best_state, best_value, self.generation, finish_reason, history, cache_stats)
+
+def evolve(problem, population_size=POPULATION_SIZE, mutation_chance=MUTATION_CHANCE,
+           elite_size=ELITE_SIZE, tournament_size=TOURNAMENT_SIZE, iterations_limit=ITERATIONS_LIMIT,
+           stagnation_limit=STAGNATION_LIMIT, time_limit=None, callback=None, initial_population=None,
+           greedy_fraction=GREEDY_SEED_FRACTION, memetic_rate=MEMETIC_RATE, stop_event=None, on_best=None,
+           profiler=None, started=None):
+    # time_limit is wall-clock from started (default: now), so seeding the population counts too
+    started = time.monotonic() if started is None else started
+    solver = GeneticSolver(problem, population_size, mutation_chance, elite_size, tournament_size,
+                           greedy_fraction, memetic_rate, profiler)
+    if profiler:
+        profiler.attach(solver)
+    try:
+        solver.initialize(initial_population, None if time_limit is None else started + time_limit)
+        return solver.run(iterations_limit, stagnation_limit, time_limit, callback, stop_event, on_best,
+                          started=started)
+    finally:
+        if profiler:
+            profiler.detach()
+
+# -------------------- ANYTIME SOLVING --------------------
+def roster_settings(n_patients):
+    # Starting point before anything is timed: larger rosters get a larger population and a higher
+    # mutation rate, since one mutation moves a smaller share of their schedule
+    population_size = min(MAX_POPULATION_SIZE, max(MIN_POPULATION_SIZE, round(4 * math.sqrt(n_patients))))
+    mutation_chance = min(MAX_MUTATION_CHANCE, MUTATION_CHANCE + 0.1 * math.log10(max(1.0, n_patients / 100)))
+    return population_size, mutation_chance
+
+class AdaptiveController:
+    # Retunes a running GeneticSolver every ADAPT_INTERVAL generations. The population is capped at
+    # the size that fits about target_generations into the budget at the measured cost per child.
+    # While the best improves the mutation rate decays back to its starting value; a stagnant,
+    # converged population gets a higher rate, grows towards the cap and takes random immigrants.
+    def __init__(self, time_budget, started=None, interval=ADAPT_INTERVAL,
+                 target_generations=BUDGET_TARGET_GENERATIONS):
+        if time_budget <= 0 or interval < 1 or target_generations < 1:
+            raise ValueError(f"Invalid anytime settings: time_budget={time_budget}, interval={interval}, "
+                             f"target_generations={target_generations}")
+        self.time_budget = time_budget
+        self.started = time.monotonic() if started is None else started
+        self.interval = interval
+        self.target_generations = target_generations
+        self.child_seconds = None
+        self.base_mutation = None
+        self.last_best = float('-inf')
+        self.last_generation = 0
+        self.last_time = None
+        self.adjustments = []
+
+    def remaining(self):
+        return self.time_budget - (time.monotonic() - self.started)
+
+    def fitting_size(self):
+        size = self.time_budget / (self.target_generations * self.child_seconds) if self.child_seconds else 0
+        return int(min(MAX_POPULATION_SIZE, max(MIN_POPULATION_SIZE, size)))
+
+    def initialize(self, solver, population=None):
+        # Like GeneticSolver.initialize, but the states after the first greedy one, with their
+        # evaluation, may only take BUDGET_INIT_SHARE of the budget; once that is used the population
+        # stops growing, though random states still fill it up to MIN_POPULATION_SIZE. The first
+        # greedy state also builds the move table, which repair needs too. A random state takes one
+        # step per patient and the table about one per candidate, so its cost is estimated from the
+        # time of one random state; if it does not fit there are no greedy states and no repairs.
+        problem = solver.problem
+        population = list(population or [])[:solver.population_size]
+        seeded = bool(population)
+        timed = time.monotonic()
+        state = problem.generate_random_state()
+        evaluate_started = time.monotonic()
+        known = problem.evaluate_population([state])
+        evaluate_seconds = time.monotonic() - evaluate_started
+        if len(population) < solver.population_size:
+            population.insert(0, state)
+        else:
+            known = known[:0]
+        if problem.move_table is None and problem.patients:
+            step_seconds = (evaluate_started - timed) / len(problem.patients)
+            table_seconds = step_seconds * sum(map(len, problem.candidates.choices))
+            if table_seconds > BUDGET_TABLE_SHARE * self.remaining():
+                solver.greedy_fraction = solver.memetic_rate = 0
+        n_greedy = round(solver.greedy_fraction * solver.population_size)
+        if solver.greedy_fraction and not seeded:
+            n_greedy = max(1, n_greedy)
+        deadline = time.monotonic() + BUDGET_INIT_SHARE * self.time_budget
+        n_made = 0
+        while len(population) < solver.population_size:
+            projected = time.monotonic() + evaluate_seconds * len(population)
+            late = projected >= deadline
+            # The MIN_POPULATION_SIZE floor gives way once the whole budget would be spent
+            if late and (len(population) >= min(MIN_POPULATION_SIZE, solver.population_size)
+                         or projected - self.started >= self.time_budget):
+                break
+            if n_made < n_greedy and (not late or not n_made):
+                population.append(problem.generate_greedy_state())
+                if not n_made:
+                    deadline = time.monotonic() + BUDGET_INIT_SHARE * self.time_budget
+                n_made += 1
+            else:
+                population.append(problem.generate_random_state())
+        solver.population = population
+        solver.population_size = len(population)
+        evaluate_started = time.monotonic()
+        solver.fitness = np.concatenate([known, problem.evaluate_population(population[len(known):])])
+        solver.generation = 0
+
+        # First estimate of the cost per child, refined from whole generations later. Evaluation is
+        # timed on the whole population since small batches cost more per state, and one repair is
+        # weighted by the memetic rate. Nothing is probed once the budget is spent.
+        operators_started = time.monotonic()
+        child = None
+        n_probed = 0
+        while n_probed < PROBE_CHILDREN and self.remaining() > 0:
+            child = problem.mutate(problem.crossover(solver.select(), solver.select()))
+            n_probed += 1
+        repair_started = time.monotonic()
+        if solver.memetic_rate and child is not None and self.remaining() > 0:
+            problem.repair(child)
+        finished = time.monotonic()
+        n_evaluated = max(1, len(population) - len(known))
+        self.child_seconds = max(1e-6, (operators_started - evaluate_started) / n_evaluated
+                                 + (repair_started - operators_started) / max(1, n_probed)
+                                 + solver.memetic_rate * (finished - repair_started))
+        solver.resize(min(solver.population_size, self.fitting_size()))
+        self.base_mutation = solver.mutation_chance
+        self.last_time = time.monotonic()
+        self.record(solver, None)
+
+    def update(self, solver, best_value):
+        generations = solver.generation - self.last_generation
+        if generations < self.interval:
             return
-        
-        # Disable button during processing
-        self.run_btn.Enable(False)
-        self.statusbar.SetStatusText("Đang chạy thuật toán...")
-        
-        # Run algorithm in separate thread
-        thread = threading.Thread(target=self.run_genetic_algorithm)
-        thread.daemon = True
-        thread.start()
-
-    def run_genetic_algorithm(self):
+        problem = solver.problem
+        now = time.monotonic()
+        children = generations * max(1, solver.population_size - solver.elite_size)
+        self.child_seconds = 0.5 * self.child_seconds + 0.5 * (now - self.last_time) / children
+        size = solver.population_size
+        diversity = None
+        immigrants = 0
+        if best_value > self.last_best:
+            solver.mutation_chance = self.base_mutation + (solver.mutation_chance - self.base_mutation) / 2
+        else:
+            diversity = population_diversity(problem.evaluator.encode_population(
+                [problem.encode(state) for state in solver.population]))
+            if diversity < CONVERGED_DIVERSITY:
+                solver.mutation_chance = min(MAX_MUTATION_CHANCE, solver.mutation_chance * 1.5)
+                # Only grow while a couple of adjustment intervals still fit in what is left
+                room = int(self.remaining() / (2 * self.interval * self.child_seconds))
+                size = max(size, min(room, round(size * 1.5)))
+                immigrants = round(IMMIGRANT_SHARE * solver.population_size)
+            else:
+                # Still diverse but not improving: lean on selection instead
+                solver.mutation_chance = max(MIN_MUTATION_CHANCE, solver.mutation_chance / 1.5)
+        # Generations may also have become slower, so the cap can shrink the population
+        size = min(size, self.fitting_size())
+        if immigrants:
+            solver.immigrate(immigrants)
+        if size != solver.population_size:
+            solver.resize(size)
+
+        self.last_best = max(self.last_best, best_value)
+        self.last_generation = solver.generation
+        self.last_time = time.monotonic()
+        self.record(solver, diversity)
+
+    def record(self, solver, diversity):
+        self.adjustments.append({'generation': solver.generation, 'elapsed': time.monotonic() - self.started,
+                                 'population_size': solver.population_size,
+                                 'mutation_chance': solver.mutation_chance, 'diversity': diversity})
+
+def evolve_within(problem, time_budget, population_size=None, mutation_chance=None, elite_size=ELITE_SIZE,
+                  tournament_size=TOURNAMENT_SIZE, stagnation_limit=STAGNATION_LIMIT, callback=None,
+                  initial_population=None, greedy_fraction=GREEDY_SEED_FRACTION, memetic_rate=MEMETIC_RATE,
+                  stop_event=None, on_best=None, profiler=None, started=None, controller=None):
+    # Anytime GA: no generation limit, stops when the budget is spent (counted from started, so
+    # the caller can include building the problem) and returns the best schedule found so far.
+    # Population size and mutation rate start from roster_settings unless given.
+    controller = controller or AdaptiveController(time_budget, started)
+    scaled_size, scaled_mutation = roster_settings(len(problem.patients))
+    solver = GeneticSolver(problem, population_size or scaled_size,
+                           scaled_mutation if mutation_chance is None else mutation_chance,
+                           elite_size, tournament_size, greedy_fraction, memetic_rate, profiler)
+    if profiler:
+        profiler.attach(solver)
+    try:
+        controller.initialize(solver, initial_population)
+        return solver.run(None, stagnation_limit, controller.remaining(), callback, stop_event, on_best,
+                          controller)
+    finally:
+        if profiler:
+            profiler.detach()
+
+# -------------------- ISLAND MODEL --------------------
+_island_problem = None
+
+def _init_island_worker(doctors, patients, incremental, calendar=DEFAULT_CALENDAR):
+    global _island_problem
+    _island_problem = ScheduleProblem(doctors, patients, incremental, calendar=calendar)
+
+def _evolve_island(population, seed, generations, settings):
+    random.seed(seed)
+    problem = _island_problem
+    # The worker's problem and cache outlive the epoch, so only this epoch's lookups are counted
+    if problem.cache:
+        problem.cache.hits = problem.cache.misses = 0
+    solver = GeneticSolver(problem, **settings)
+    solver.initialize([problem.track(state) for state in population] if problem.incremental else population)
+    result = solver.run(iterations_limit=generations, stagnation_limit=None)
+    return [problem.encode(state) for state in solver.population], solver.fitness.tolist(), result.cache_stats
+
+def evolve_islands(doctors, patients, islands=ISLANDS, workers=WORKERS, migration_interval=MIGRATION_INTERVAL,
+                   migrants=MIGRANTS, seed=ISLAND_SEED, population_size=POPULATION_SIZE,
+                   mutation_chance=MUTATION_CHANCE, elite_size=ELITE_SIZE, tournament_size=TOURNAMENT_SIZE,
+                   iterations_limit=ITERATIONS_LIMIT, stagnation_limit=STAGNATION_LIMIT, time_limit=None,
+                   callback=None, incremental=False, greedy_fraction=GREEDY_SEED_FRACTION,
+                   memetic_rate=MEMETIC_RATE, stop_event=None, on_best=None, calendar=DEFAULT_CALENDAR):
+    if islands < 1 or migration_interval < 1:
+        raise ValueError(f"Invalid island settings: islands={islands}, migration_interval={migration_interval}")
+    settings = {'population_size': population_size, 'mutation_chance': mutation_chance,
+                'elite_size': elite_size, 'tournament_size': tournament_size, 'greedy_fraction': greedy_fraction,
+                'memetic_rate': memetic_rate}
+    workers = min(workers or os.cpu_count() or 1, islands)
+    initargs = (doctors, patients, incremental, calendar)
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_island_worker, initargs=initargs)
+    else:
+        _init_island_worker(*initargs)
+
+    started = time.monotonic()
+    populations = [[] for _ in range(islands)]
+    best_state, best_value = None, float('-inf')
+    history = []
+    cache_stats = None
+    generation = stagnant = epoch = 0
+    finish_reason = 'iterations_limit'
+    try:
+        # At least one epoch runs, so there is always a schedule to return; with iterations_limit=0
+        # it runs no generations and only builds and scores the island populations
+        while not epoch or generation < iterations_limit:
+            if epoch and stop_event is not None and stop_event.is_set():
+                finish_reason = 'cancelled'
+                break
+            generations = min(migration_interval, iterations_limit - generation)
+            # Each island gets a fixed seed per epoch, so results do not depend on scheduling
+            jobs = [(populations[i], (seed * islands + i) * 1000003 + epoch, generations, settings)
+                    for i in range(islands)]
+            if executor:
+                outcomes = list(executor.map(_evolve_island, *zip(*jobs)))
+            else:
+                outcomes = [_evolve_island(*job) for job in jobs]
+            generation += generations
+            epoch += 1
+
+            populations = [population for population, _, _ in outcomes]
+            fitness = [values for _, values, _ in outcomes]
+            cache_stats = combined_cache_stats([cache_stats] + [stats for _, _, stats in outcomes])
+            all_values = [value for values in fitness for value in values]
+            mean = float(np.mean(all_values))
+            island, idx = max(((i, int(np.argmax(values))) for i, values in enumerate(fitness)),
+                              key=lambda pick: fitness[pick[0]][pick[1]])
+            if generations:
+                history.append((fitness[island][idx], mean))
+            if fitness[island][idx] > best_value:
+                best_state, best_value = populations[island][idx], fitness[island][idx]
+                stagnant = 0
+                if on_best:
+                    on_best(generation, best_state, best_value)
+            else:
+                stagnant += generations
+
+            # Ring migration: the best of island i-1 replace the worst of island i
+            if islands > 1 and migrants:
+                ranked = [np.argsort(values, kind='stable') for values in fitness]
+                emigrants = [[populations[i][j] for j in ranked[i][::-1][:migrants]] for i in range(islands)]
+                for i in range(islands):
+                    for slot_idx, migrant in zip(ranked[i][:migrants], emigrants[i - 1]):
+                        populations[i][slot_idx] = migrant
+
+            if callback:
+                callback(generation, best_value, mean)
+
+            if stagnation_limit and stagnant >= stagnation_limit:
+                finish_reason = 'stagnation'
+                break
+            if time_limit is not None and time.monotonic() - started >= time_limit:
+                finish_reason = 'time_limit'
+                break
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return SolverResult(best_state, best_value, generation, finish_reason, history, cache_stats)
+
+# -------------------- SPECIALTY DECOMPOSITION --------------------
+def split_by_specialty(doctors, patients):
+    groups = {}
+    for doc in doctors:
+        groups.setdefault(doc.get('specialty'), ([], []))[0].append(doc)
+    for i, patient in enumerate(patients):
+        if patient.get('specialty') in groups:
+            groups[patient.get('specialty')][1].append(i)
+    return [(specialty, group_doctors, indices)
+            for specialty, (group_doctors, indices) in groups.items() if indices]
+
+def resolve_slot_conflicts(problem, state):
+    # Move genes that collide with an earlier patient's slots to a free candidate
+    evaluator = problem.evaluator
+    state = array('i', problem.encode(state))
+    shift_count = problem.shift_counts(state)
+    used = set()
+    for i, gene in enumerate(state):
+        if gene < 0:
+            continue
+        duration = evaluator.duration_list[i]
+        slot_int = gene % evaluator.total_slots
+        if used.isdisjoint(range(slot_int, slot_int + duration)):
+            used.update(range(slot_int, slot_int + duration))
+            continue
+
+        own_key = problem.gene_key(gene)
+        for candidate, key in zip(problem.candidates.choices[i], problem.candidates.key_ids[i]):
+            cand_doc, cand_slot = divmod(candidate, evaluator.total_slots)
+            if (cand_slot + duration <= evaluator.total_slots
+                    and evaluator.free_run_list[cand_doc][cand_slot] >= duration
+                    and used.isdisjoint(range(cand_slot, cand_slot + duration))
+                    and shift_count[key] - (key == own_key) < evaluator.capacity_list[key]):
+                shift_count[own_key] -= 1
+                shift_count[key] += 1
+                state[i] = candidate
+                used.update(range(cand_slot, cand_slot + duration))
+                break
+    return state
+
+def _solve_specialty(doctors, patients, seed, settings, calendar=DEFAULT_CALENDAR, deadline=None):
+    # deadline is wall-clock time.time(), comparable across worker processes
+    started = time.monotonic()
+    if deadline is not None:
+        settings = dict(settings, time_limit=max(0.0, deadline - time.time()))
+    random.seed(seed)
+    problem = ScheduleProblem(doctors, patients, calendar=calendar)
+    result = evolve(problem, started=started, **settings)
+    return problem.decode(result.state), result.generations, result.cache_stats
+
+def solve_by_specialty(doctors, patients, workers=WORKERS, seed=ISLAND_SEED, merge_generations=MERGE_GENERATIONS,
+                       population_size=POPULATION_SIZE, mutation_chance=MUTATION_CHANCE, elite_size=ELITE_SIZE,
+                       tournament_size=TOURNAMENT_SIZE, iterations_limit=ITERATIONS_LIMIT,
+                       stagnation_limit=STAGNATION_LIMIT, time_limit=None, callback=None,
+                       greedy_fraction=GREEDY_SEED_FRACTION, memetic_rate=MEMETIC_RATE, stop_event=None,
+                       on_best=None, profiler=None, calendar=DEFAULT_CALENDAR, started=None):
+    # Only the final global pass watches stop_event; the per-specialty runs are short and may be
+    # in other processes. time_limit covers the whole run from started: the group runs share it
+    # and the global pass gets what is left.
+    started = time.monotonic() if started is None else started
+    deadline = None if time_limit is None else time.time() + time_limit - (time.monotonic() - started)
+    settings = {'population_size': population_size, 'mutation_chance': mutation_chance,
+                'elite_size': elite_size, 'tournament_size': tournament_size,
+                'iterations_limit': iterations_limit, 'stagnation_limit': stagnation_limit,
+                'time_limit': time_limit, 'greedy_fraction': greedy_fraction, 'memetic_rate': memetic_rate}
+    groups = split_by_specialty(doctors, patients)
+    jobs = [(group_doctors, [patients[i] for i in indices], seed * 1000003 + group_idx, settings, calendar,
+             deadline)
+            for group_idx, (_, group_doctors, indices) in enumerate(groups)]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(_solve_specialty, *zip(*jobs)))
+    else:
+        outcomes = [_solve_specialty(*job) for job in jobs]
+
+    # Merge back in the original patient order
+    merged = [None] * len(patients)
+    for (_, _, indices), (state, _, _) in zip(groups, outcomes):
+        for i, assign in zip(indices, state):
+            merged[i] = assign
+
+    # Groups do not see each other's slot usage nor the hospital-wide workload variance,
+    # so resolve shared slots and finish with a short global pass seeded from the merged schedule
+    random.seed(seed)
+    problem = ScheduleProblem(doctors, patients, calendar=calendar)
+    merged = resolve_slot_conflicts(problem, problem.encode(merged))
+    initial_population = [merged] + [problem.mutate(merged) for _ in range(population_size - 1)]
+    result = evolve(problem, population_size, mutation_chance, elite_size, tournament_size,
+                    iterations_limit=merge_generations, stagnation_limit=stagnation_limit, time_limit=time_limit,
+                    callback=callback, initial_population=initial_population, greedy_fraction=greedy_fraction,
+                    memetic_rate=memetic_rate, stop_event=stop_event, on_best=on_best, profiler=profiler,
+                    started=started)
+    group_generations = max((generations for _, generations, _ in outcomes), default=0)
+    cache_stats = combined_cache_stats([stats for _, _, stats in outcomes] + [result.cache_stats])
+    return SolverResult(result.state, result.value, group_generations + result.generations,
+                        result.finish_reason, result.history, cache_stats)
+
+# -------------------- WARM START --------------------
+def schedule_assignments(state, doctors, patients, calendar=DEFAULT_CALENDAR):
+    return {record['patient_id']: (record['slot'], record['doctor'])
+            for record in schedule_to_records(state, doctors, patients, calendar)}
+
+def warm_start_state(problem, previous_assignments, previous_patients=None):
+    # Carry over the previous (slot, doctor) of every unchanged patient, matched by patient id.
+    # New or edited patients and those whose old assignment is no longer possible are affected.
+    previous_patients = {patient.get('id', i + 1): patient for i, patient in enumerate(previous_patients or [])}
+    state = array('i', [-1] * len(problem.patients))
+    affected = []
+    for i, patient in enumerate(problem.patients):
+        patient_id = patient.get('id', i + 1)
+        gene = encode_gene(previous_assignments.get(patient_id), problem.evaluator.doctor_index,
+                           problem.calendar.total_slots)
+        if gene >= 0 and gene in problem.candidates.choices[i]:
+            state[i] = gene
+        if patient_id not in previous_assignments and patient_id in previous_patients:
+            continue  # was unassigned before and still is unless the search finds room
+        if state[i] < 0 or (previous_patients and previous_patients.get(patient_id) != patient):
+            affected.append(i)
+    return state, affected
+
+def reschedule_neighborhood(problem, state, affected, previous_assignments, previous_patients=None):
+    # Patients sharing a doctor shift or a slot with an affected patient's candidates or with a
+    # cancelled appointment may move, as may every patient without an assignment
+    evaluator = problem.evaluator
+    total_slots = evaluator.total_slots
+    touched_keys = set()
+    touched_slots = set()
+    for i in affected:
+        touched_keys.update(problem.candidates.key_ids[i])
+        for gene in problem.candidates.choices[i]:
+            slot_int = gene % total_slots
+            touched_slots.update(range(slot_int, slot_int + max(evaluator.duration_list[i], 1)))
+
+    current_ids = {patient.get('id', i + 1) for i, patient in enumerate(problem.patients)}
+    durations = {patient.get('id', i + 1): problem.calendar.duration_slots(patient.get('duration', 15))
+                 for i, patient in enumerate(previous_patients or [])}
+    for patient_id, assign in previous_assignments.items():
+        gene = encode_gene(assign, evaluator.doctor_index, total_slots)
+        if patient_id in current_ids or gene < 0:
+            continue
+        slot_int = gene % total_slots
+        touched_keys.add(problem.gene_key(gene))
+        touched_slots.update(range(slot_int, slot_int + max(durations.get(patient_id, 1), 1)))
+
+    mutable = set(affected)
+    for i, gene in enumerate(state):
+        if not problem.candidates.choices[i]:
+            continue
+        if gene < 0:
+            mutable.add(i)
+            continue
+        slot_int = gene % total_slots
+        if (problem.gene_key(gene) in touched_keys
+                or not touched_slots.isdisjoint(range(slot_int, slot_int + max(evaluator.duration_list[i], 1)))):
+            mutable.add(i)
+    return sorted(mutable)
+
+def place_affected(problem, state, affected):
+    # Best insertion of each affected patient, highest priority first. For every candidate the
+    # patients in the way (owners of its slots, members of an over-cap shift) move to their best
+    # alternative, which may be leaving them unassigned. Scored with exact incremental deltas; each
+    # candidate is tried in place and undone, since the tracked state only depends on the genes.
+    evaluator = problem.evaluator
+    total_slots = evaluator.total_slots
+    capacity = evaluator.capacity_list
+    tracked = problem.track(state)
+
+    def may_accept(j, gene, key):
+        # An alternative that would be skipped or penalized never beats leaving j unassigned
+        doc_idx, slot_int = divmod(gene, total_slots)
+        duration = evaluator.duration_list[j]
+        if (slot_int + duration > total_slots or evaluator.free_run_list[doc_idx][slot_int] < duration
+                or not evaluator.working_list[doc_idx][evaluator.slot_keys[slot_int]]
+                or tracked.counts[key] + (key != tracked.key_of[j]) > capacity[key]):
+            return False
+        return not any(0 <= tracked.owner[s] < j for s in range(slot_int, slot_int + duration))
+
+    for i in sorted(affected, key=lambda i: -evaluator.priority_list[i]):
+        best_changes, best_value = [], tracked.fitness
+        for gene in problem.candidates.choices[i]:
+            undo = [(i, tracked.genes[i])]
+            tracked.assign(i, gene)
+            slot_int = gene % total_slots
+            blockers = {tracked.owner[s]
+                        for s in range(slot_int, min(slot_int + evaluator.duration_list[i], total_slots))}
+            key = tracked.key_of[i]
+            if tracked.counts[key] > capacity[key]:
+                blockers.update(tracked.members[key])
+            blockers.difference_update((-1, i))
+
+            for j in sorted(blockers):
+                current = tracked.genes[j]
+                alternatives = [alternative for alternative, alternative_key
+                                in zip(problem.candidates.choices[j], problem.candidates.key_ids[j])
+                                if alternative != current and may_accept(j, alternative, alternative_key)]
+                best_gene, best_gene_value = current, tracked.fitness
+                for alternative in alternatives + [-1]:
+                    if alternative != current:
+                        tracked.assign(j, alternative)
+                        if tracked.fitness > best_gene_value:
+                            best_gene, best_gene_value = alternative, tracked.fitness
+                tracked.assign(j, best_gene)
+                if best_gene != current:
+                    undo.append((j, current))
+            if tracked.fitness > best_value:
+                best_changes, best_value = [(j, tracked.genes[j]) for j, _ in undo], tracked.fitness
+            for j, previous in reversed(undo):
+                tracked.assign(j, previous)
+        for j, gene in best_changes:
+            tracked.assign(j, gene)
+    return array('i', tracked.genes)
+
+def keep_worthwhile_changes(problem, state, warm_state, movable, change_penalty=RESCHEDULE_CHANGE_PENALTY):
+    # Put a moved patient back on their old assignment unless the move gains more than change_penalty
+    state = array('i', state)
+    value = problem.value(state)
+    for i in movable:
+        if warm_state[i] < 0 or state[i] == warm_state[i]:
+            continue
+        trial = array('i', state)
+        trial[i] = warm_state[i]
+        trial_value = problem.value(trial)
+        if trial_value > value - change_penalty:
+            state, value = trial, trial_value
+    return state, value
+
+def reschedule(doctors, patients, previous_assignments, previous_patients=None, availability=None,
+               population_size=RESCHEDULE_POPULATION_SIZE, mutation_chance=MUTATION_CHANCE,
+               elite_size=ELITE_SIZE, tournament_size=TOURNAMENT_SIZE, iterations_limit=RESCHEDULE_GENERATIONS,
+               stagnation_limit=RESCHEDULE_STAGNATION_LIMIT, time_limit=RESCHEDULE_TIME_LIMIT,
+               change_penalty=RESCHEDULE_CHANGE_PENALTY, callback=None, stop_event=None, on_best=None,
+               profiler=None, calendar=None):
+    problem = ScheduleProblem(doctors, patients, availability=availability, calendar=calendar)
+    warm_state, affected = warm_start_state(problem, previous_assignments, previous_patients)
+    mutable = reschedule_neighborhood(problem, warm_state, affected, previous_assignments, previous_patients)
+    if not mutable:
+        return SolverResult(warm_state, problem.value(warm_state), 0, 'unchanged', [],
+                            problem.cache.stats() if problem.cache else None)
+
+    problem.mutable = mutable
+    placed = place_affected(problem, warm_state, affected)
+    initial_population = [placed]
+    while len(initial_population) < population_size:
+        state = placed
+        for _ in range(random.randint(1, 3)):
+            state = problem.mutate(state)
+        initial_population.append(state)
+    # No memetic step: place_affected already did the targeted search, and repair would build the
+    # move table for the whole roster
+    result = evolve(problem, population_size, mutation_chance, elite_size, tournament_size,
+                    iterations_limit=iterations_limit, stagnation_limit=stagnation_limit, time_limit=time_limit,
+                    callback=callback, initial_population=initial_population, stop_event=stop_event,
+                    on_best=on_best, profiler=profiler, memetic_rate=0)
+
+    affected = set(affected)
+    state, value = keep_worthwhile_changes(problem, result.state, warm_state,
+                                           [i for i in mutable if i not in affected], change_penalty)
+    return SolverResult(state, value, result.generations, result.finish_reason, result.history,
+                        problem.cache.stats() if problem.cache else None)
+
+# -------------------- RESULT CACHE --------------------
+def normalized_input(doctors, patients, calendar=DEFAULT_CALENDAR):
+    # Everything the solver reads, in solver order. Free slots are compared as ranges, so
+    # free_ranges and the equivalent free_slots labels give the same key.
+    return {
+        'calendar': calendar.settings(),
+        'doctors': [[doc.get('name'), doc.get('specialty'), doc.get('max_patients_per_shift'),
+                     sorted([off[0], off[1]] for off in doc.get('off_shifts', [])),
+                     calendar.mask_ranges(calendar.free_mask(doc))] for doc in doctors],
+        'patients': [[patient.get('id', i + 1), patient.get('specialty'), patient.get('priority'),
+                      patient.get('duration'), [str(slot) for slot in patient.get('free_slots', [])]]
+                     for i, patient in enumerate(patients)],
+    }
+
+def result_cache_key(doctors, patients, settings, calendar=DEFAULT_CALENDAR):
+    payload = json.dumps({'version': RESULT_CACHE_VERSION, 'settings': settings,
+                          'input': normalized_input(doctors, patients, calendar)},
+                         sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+class ResultCache:
+    # One JSON file per result, named by its key. Reading an entry refreshes its modification
+    # time and the oldest files are removed once there are more than maxsize.
+    def __init__(self, directory=RESULT_CACHE_DIR, maxsize=RESULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError(f"Invalid cache size: {maxsize}")
+        self.directory = directory
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self.path(key)
         try:
-            define_doctor_availability(self.doctors)
-            problem = ScheduleProblem(self.doctors, self.patients)
-            
-            # Update progress periodically
-            wx.CallAfter(self.update_progress, 50)
-            
-            self.result = genetic(
-                problem=problem,
-                population_size=100,
-                mutation_chance=0.3,
-                iterations_limit=300
-            )
-            
-            wx.CallAfter(self.update_progress, 100)
-            wx.CallAfter(self.algorithm_completed)
-            
-        except Exception as e:
-            wx.CallAfter(self.algorithm_error, str(e))
-
-    def update_progress(self, value):
-        self.progress.SetValue(value)
-
-    def algorithm_completed(self):
-        # Update UI with results
-        self.schedule_grid.update_schedule(self.result, self.patients)
-        self.workload_panel.update_workload(self.result, self.doctors, self.patients)
-        
-        # Update summary
-        assigned_count = sum(1 for assign in self.result.state if assign)
-        score = ScheduleProblem(self.doctors, self.patients).value(self.result.state)
-        
-        summary = self.summary_text.GetValue()
-        summary += f"\n\n=== KẾT QUẢ THUẬT TOÁN ===\n"
-        summary += f"Tổng số bệnh nhân được lịch hẹn: {assigned_count}/{len(self.patients)}\n"
-        summary += f"Điểm số của lịch: {score}\n"
-        
-        self.summary_text.SetValue(summary)
-        
-        # Re-enable button and update status
-        self.run_btn.Enable(True)
-        self.progress.SetValue(0)
-        self.statusbar.SetStatusText(f"Hoàn thành - {assigned_count}/{len(self.patients)} bệnh nhân được xếp lịch")
-
-    def algorithm_error(self, error_msg):
-        wx.MessageBox(f"Lỗi khi chạy thuật toán: {error_msg}", "Lỗi", wx.OK | wx.ICON_ERROR)
-        self.run_btn.Enable(True)
-        self.progress.SetValue(0)
-        self.statusbar.SetStatusText("Sẵn sàng")
-
-    def on_exit(self, event):
-        self.Close()
-
-class MedicalSchedulerApp(wx.App):
-    def OnInit(self):
-        frame = MainFrame()
-        frame.Show()
-        return True
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            result = SolverResult(array('i', entry['state']), entry['value'], entry['generations'],
+                                  entry['finish_reason'], [tuple(item) for item in entry['history']])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {'state': [int(gene) for gene in result.state], 'value': float(result.value),
+                 'generations': result.generations, 'finish_reason': result.finish_reason,
+                 'history': [[float(value) for value in item] for item in result.history]}
+        # Write then rename, so a reader never sees half an entry
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def entries(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        for _, path in entries[:max(0, len(entries) - self.maxsize)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.entries()), 'maxsize': self.maxsize, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+# -------------------- SOLVER ENTRY POINTS --------------------
+def solve(doctors, patients, availability=None, workers=WORKERS, decompose=DECOMPOSE_BY_SPECIALTY,
+          seed=ISLAND_SEED, population_size=POPULATION_SIZE, mutation_chance=MUTATION_CHANCE,
+          elite_size=ELITE_SIZE, tournament_size=TOURNAMENT_SIZE, iterations_limit=ITERATIONS_LIMIT,
+          stagnation_limit=STAGNATION_LIMIT, time_limit=None, callback=None,
+          greedy_fraction=GREEDY_SEED_FRACTION, memetic_rate=MEMETIC_RATE, stop_event=None, on_best=None,
+          profiler=None, calendar=None, cache=None, time_budget=None):
+    # time_budget: anytime mode, see evolve_within; it picks its own population size, mutation
+    # rate and generation count, and needs the single-process solver to retune it
+    started = time.monotonic()
+    if time_budget is not None and (decompose or workers != 1):
+        raise ValueError("A time budget needs workers=1 and no specialty decomposition")
+    calendar = calendar or (availability.calendar if availability else DEFAULT_CALENDAR)
+    solver_settings = {'population_size': population_size, 'mutation_chance': mutation_chance,
+                       'elite_size': elite_size, 'tournament_size': tournament_size,
+                       'iterations_limit': iterations_limit, 'stagnation_limit': stagnation_limit,
+                       'time_limit': time_limit, 'greedy_fraction': greedy_fraction, 'memetic_rate': memetic_rate}
+    settings = dict(solver_settings, callback=callback, stop_event=stop_event, on_best=on_best)
+
+    key = None
+    if cache is not None:
+        # Island results do not depend on the number of worker processes, only on using islands
+        key_settings = dict(solver_settings, seed=seed, decompose=decompose, islands=workers != 1)
+        if time_budget is not None:
+            key_settings['time_budget'] = time_budget
+        key = result_cache_key(doctors, patients, key_settings, calendar)
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    if time_budget is not None:
+        random.seed(seed)
+        problem = ScheduleProblem(doctors, patients, availability=availability, calendar=calendar)
+        result = evolve_within(problem, time_budget, elite_size=elite_size, tournament_size=tournament_size,
+                               stagnation_limit=stagnation_limit, callback=callback,
+                               greedy_fraction=greedy_fraction, memetic_rate=memetic_rate, stop_event=stop_event,
+                               on_best=on_best, profiler=profiler, started=started)
+    elif decompose:
+        result = solve_by_specialty(doctors, patients, workers=workers, seed=seed, profiler=profiler,
+                                    calendar=calendar, started=started, **settings)
+    elif workers != 1:
+        if profiler:
+            # Operators run in worker processes; only the per-generation fitness is visible here
+            settings['callback'] = profiled_callback(profiler, callback)
+        result = evolve_islands(doctors, patients, workers=workers, seed=seed, calendar=calendar, **settings)
+    else:
+        # Seeded like the island and specialty runs, so the result depends only on the input
+        random.seed(seed)
+        result = evolve(ScheduleProblem(doctors, patients, availability=availability, calendar=calendar),
+                        profiler=profiler, started=started, **settings)
+
+    if key is not None and result.finish_reason != 'cancelled':
+        cache.put(key, result)
+    return result
+
+def profiled_callback(profiler, callback=None):
+    def on_generation(generation, best_value, mean_value):
+        profiler.record_generation(generation, best_value, mean_value)
+        if callback:
+            callback(generation, best_value, mean_value)
+    return on_generation
+
+class ThrottledCallback:
+    # Forwards at most max_rate calls per second; the latest skipped call is kept for flush()
+    def __init__(self, callback, max_rate=PROGRESS_MAX_RATE):
+        self.callback = callback
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.last = float('-inf')
+        self.pending = None
+
+    def __call__(self, *args):
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.pending = None
+            self.callback(*args)
+        else:
+            self.pending = args
+
+    def flush(self):
+        if self.pending is not None:
+            args, self.pending = self.pending, None
+            self.last = time.monotonic()
+            self.callback(*args)
+
+def schedule_to_records(state, doctors, patients, calendar=DEFAULT_CALENDAR):
+    records = []
+    for i, gene in enumerate(state):
+        assign = decode_gene(gene, doctors, calendar.total_slots)
+        if not assign or i >= len(patients):
+            continue
+        slot_int, doctor = assign
+        day, shift, time_slot = get_day_shift_slot(slot_int, calendar)
+        records.append({
+            'patient_id': patients[i].get('id', i + 1),
+            'doctor': doctor,
+            'slot': slot_int,
+            'day': day,
+            'shift': shift,
+            'slot_in_shift': time_slot,
+            'priority': patients[i].get('priority', 1),
+        })
+    return records
+
+def schedule_output(result, doctors, patients, calendar=DEFAULT_CALENDAR, elapsed=None):
+    records = schedule_to_records(result.state, doctors, patients, calendar)
+    return {
+        'score': result.value,
+        'generations': result.generations,
+        'finish_reason': result.finish_reason,
+        'elapsed_seconds': None if elapsed is None else round(elapsed, 3),
+        'fitness_cache': result.cache_stats,
+        'assigned': len(records),
+        'patients': len(patients),
+        'schedule': records,
+        'off_shifts': {doc['name']: doc.get('off_shifts', []) for doc in doctors},
+    }
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# -------------------- ROSTER LOADING --------------------
+def iter_json_records(path, chunk_size=LOAD_CHUNK_SIZE):
+    # Objects of a JSON array or of NDJSON (one object per line), decoded one by one from chunks
+    # of the file, so a large roster is never held as one string nor one parsed document
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+        in_array = None
+        # In an array: a record or ']' after '[', then exactly one ',' or ']' after every record,
+        # a record after every ',' and only whitespace after ']'
+        expect = 'first'
+        count = 0
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    break
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+            char = buffer[pos]
+            if in_array is None:
+                in_array = char == '['
+                pos += in_array
+                continue
+            if in_array:
+                if expect == 'end':
+                    raise ValueError(f"{path}: unexpected data after the closing ]")
+                if expect == 'separator':
+                    if char not in ',]':
+                        raise ValueError(f"{path}: record {count}: expected ',' or ']' after it")
+                    pos += 1
+                    expect = 'end' if char == ']' else 'record'
+                    continue
+                if char == ']' and expect == 'first':
+                    pos += 1
+                    expect = 'end'
+                    continue
+                if char in ',]':
+                    raise ValueError(f"{path}: record {count + 1}: expected a record, got {char!r}")
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ValueError(f"{path}: record {count + 1}: {exc.msg}") from None
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            count += 1
+            expect = 'separator'
+            yield record
+        if in_array and expect != 'end':
+            raise ValueError(f"{path}: record {count}: file ends before the closing ]")
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_doctor(record, number, path=''):
+    if not isinstance(record, dict):
+        raise ValueError(f"{path}: record {number}: expected an object")
+    name, specialty = record.get('name'), record.get('specialty')
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"{path}: record {number}: missing doctor name")
+    if not isinstance(specialty, str):
+        raise ValueError(f"{path}: record {number}: missing specialty of {name}")
+    capacity = record.get('max_patients_per_shift', MAX_PATIENTS_PER_SHIFT)
+    if not is_int(capacity) or capacity < 0:
+        raise ValueError(f"{path}: record {number}: invalid max_patients_per_shift {capacity!r}")
+    # Slot labels, [start, end) slot ranges and [day, shift, label] off shifts
+    free_slots = record.get('free_slots', [])
+    if not isinstance(free_slots, list) or not all(isinstance(slot, str) or is_int(slot) for slot in free_slots):
+        raise ValueError(f"{path}: record {number}: free_slots of {name} must be a list of slot labels")
+    free_ranges = record.get('free_ranges', [])
+    if not isinstance(free_ranges, list) or not all(
+            isinstance(pair, (list, tuple)) and len(pair) == 2 and all(map(is_int, pair)) for pair in free_ranges):
+        raise ValueError(f"{path}: record {number}: free_ranges of {name} must be a list of [start, end] slots")
+    off_shifts = record.get('off_shifts', [])
+    if not isinstance(off_shifts, list) or not all(
+            isinstance(off, (list, tuple)) and len(off) == 3 and is_int(off[0]) and is_int(off[1])
+            and isinstance(off[2], str) for off in off_shifts):
+        raise ValueError(f"{path}: record {number}: off_shifts of {name} must be a list of [day, shift, label]")
+    if 'free_slots' in record:
+        record['free_slots'] = [sys.intern(str(slot)) for slot in free_slots]
+    # Shared strings: every patient and doctor of a specialty points at one object
+    record['name'] = sys.intern(name)
+    record['specialty'] = sys.intern(specialty)
+    return record
+
+def validate_patient(record, number, path=''):
+    if not isinstance(record, dict):
+        raise ValueError(f"{path}: record {number}: expected an object")
+    if not isinstance(record.get('specialty'), str):
+        raise ValueError(f"{path}: record {number}: missing specialty")
+    for field in ('priority', 'duration'):
+        if field in record and not is_int(record[field]):
+            raise ValueError(f"{path}: record {number}: invalid {field} {record[field]!r}")
+    free_slots = record.get('free_slots', [])
+    if not isinstance(free_slots, list):
+        raise ValueError(f"{path}: record {number}: free_slots must be a list")
+    record['specialty'] = sys.intern(record['specialty'])
+    record['free_slots'] = [sys.intern(str(slot)) for slot in free_slots]
+    return record
+
+def load_doctors(path, chunk_size=LOAD_CHUNK_SIZE):
+    return [validate_doctor(record, number, path)
+            for number, record in enumerate(iter_json_records(path, chunk_size), 1)]
+
+def load_patients(path, chunk_size=LOAD_CHUNK_SIZE):
+    return [validate_patient(record, number, path)
+            for number, record in enumerate(iter_json_records(path, chunk_size), 1)]
+
+# -------------------- BINARY SNAPSHOT --------------------
+# A directory with meta.json (calendar, specialty and doctor names, patient ids unless all
+# are integers) and one .npy file per array. Slot sets are little-endian packed bitsets,
+# one row of ceil(total_slots / 8) bytes per doctor or patient.
+def pack_slot_sets(rows, cols, n_rows, total_slots):
+    bits = np.zeros((n_rows, (total_slots + 7) // 8), dtype=np.uint8)
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    np.bitwise_or.at(bits, (rows, cols >> 3), (1 << (cols & 7)).astype(np.uint8))
+    return bits
+
+def save_snapshot(path, doctors, patients, calendar=DEFAULT_CALENDAR):
+    os.makedirs(path, exist_ok=True)
+    total_slots = calendar.total_slots
+    specialties = {}
+    for record in list(doctors) + list(patients):
+        specialties.setdefault(record.get('specialty'), len(specialties))
+
+    off_shifts = [[doc_idx, off[0], off[1]] for doc_idx, doc in enumerate(doctors) for off in doc.get('off_shifts', [])]
+    slot_rows, slot_cols = [], []
+    for i, (_, slots) in enumerate(patient_free_slots(patients, total_slots)):
+        slot_rows.extend([i] * len(slots))
+        slot_cols.extend(slots)
+
+    ids = [patient.get('id', i + 1) for i, patient in enumerate(patients)]
+    integer_ids = all(isinstance(patient_id, int) and not isinstance(patient_id, bool) for patient_id in ids)
+    arrays = {
+        'doctor_specialty': np.array([specialties[doc.get('specialty')] for doc in doctors], dtype=np.int32),
+        'doctor_capacity': np.array([doc.get('max_patients_per_shift', MAX_PATIENTS_PER_SHIFT) for doc in doctors],
+                                    dtype=np.int32),
+        'doctor_free': np.packbits(AvailabilityIndex(doctors, calendar).free_matrix(),
+                                   axis=1, bitorder='little'),
+        'off_shifts': np.array(off_shifts, dtype=np.int32).reshape(-1, 3),
+        'patient_specialty': np.array([specialties[patient.get('specialty')] for patient in patients], dtype=np.int32),
+        'patient_priority': np.array([patient.get('priority', 1) for patient in patients], dtype=np.int32),
+        'patient_duration': np.array([patient.get('duration', 15) for patient in patients], dtype=np.int32),
+        'patient_slots': pack_slot_sets(slot_rows, slot_cols, len(patients), total_slots),
+    }
+    if integer_ids:
+        arrays['patient_id'] = np.array(ids, dtype=np.int64)
+    for name, values in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    meta = {'version': SNAPSHOT_VERSION, 'calendar': calendar.settings(), 'specialties': list(specialties),
+            'doctor_names': [doc.get('name') for doc in doctors], 'patient_ids': None if integer_ids else ids}
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+class RosterSnapshot:
+    def __init__(self, path, mmap_mode='r'):
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {meta.get('version')}")
+        self.path = path
+        self.calendar = Calendar(**meta['calendar'])
+        self.specialties = [sys.intern(specialty) if isinstance(specialty, str) else specialty
+                            for specialty in meta['specialties']]
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        # Doctors are few and turned back into records; patients stay in the mapped arrays
+        free_bits = load('doctor_free')
+        capacity = load('doctor_capacity').tolist()
+        specialty = load('doctor_specialty').tolist()
+        off_shifts = [[] for _ in meta['doctor_names']]
+        for doc_idx, day_idx, shift_idx in load('off_shifts').tolist():
+            off_shifts[doc_idx].append((day_idx, shift_idx,
+                                        f"{self.calendar.days[day_idx]}_{self.calendar.shifts[shift_idx]}"))
+        self.doctors = []
+        for doc_idx, name in enumerate(meta['doctor_names']):
+            mask = int.from_bytes(free_bits[doc_idx].tobytes(), 'little') & self.calendar.full_mask
+            self.doctors.append({'name': sys.intern(name), 'specialty': self.specialties[specialty[doc_idx]],
+                                 'max_patients_per_shift': capacity[doc_idx], 'off_shifts': off_shifts[doc_idx],
+                                 'free_ranges': self.calendar.mask_ranges(mask)})
+
+        ids = meta['patient_ids']
+        if ids is None:
+            ids = load('patient_id')
+        self.patients = SnapshotPatients(path, ids, self.specialties, load('patient_specialty'),
+                                         load('patient_priority'), load('patient_duration'), load('patient_slots'),
+                                         self.calendar.total_slots)
+
+def open_snapshot(path, mmap_mode='r'):
+    return RosterSnapshot(path, mmap_mode)
+
+def _open_snapshot_patients(path):
+    return RosterSnapshot(path).patients
+
+class SnapshotPatients:
+    # Read-only patient list over the snapshot arrays. Records are only built when indexed;
+    # the solver reads the arrays directly.
+    def __init__(self, path, ids, specialties, specialty_ids, priorities, durations, slot_bits, total_slots):
+        self.path = path
+        self.ids = ids
+        self.specialties = specialties
+        self.specialty_ids = specialty_ids
+        self.priorities = priorities
+        self.durations = durations
+        self.slot_bits = slot_bits
+        self.total_slots = total_slots
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        slots = next(self.iter_slots(index, index + 1))
+        patient_id = self.ids[index]
+        return {'id': patient_id.item() if isinstance(patient_id, np.generic) else patient_id,
+                'specialty': self.specialties[self.specialty_ids[index]],
+                'priority': self.priorities[index].item(), 'duration': self.durations[index].item(),
+                'free_slots': [str(slot) for slot in slots.tolist()]}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __reduce__(self):
+        # Worker processes map the files again instead of receiving copies of the arrays
+        return _open_snapshot_patients, (self.path,)
+
+    def specialty_names(self):
+        for specialty_id in self.specialty_ids.tolist():
+            yield self.specialties[specialty_id]
+
+    def iter_slots(self, start=0, stop=None, block=SNAPSHOT_BLOCK):
+        stop = len(self) if stop is None else stop
+        for block_start in range(start, stop, block):
+            bits = np.unpackbits(self.slot_bits[block_start:min(block_start + block, stop)], axis=1,
+                                 bitorder='little')[:, :self.total_slots]
+            rows, cols = np.nonzero(bits)
+            bounds = np.searchsorted(rows, np.arange(len(bits) + 1))
+            for row in range(len(bits)):
+                yield cols[bounds[row]:bounds[row + 1]]
+
+# -------------------- COMMAND LINE --------------------
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Lập lịch khám bệnh bằng thuật toán di truyền. "
+                                                 "Không có --doctors/--patients thì mở giao diện.")
+    parser.add_argument('--doctors', help="File JSON hoặc NDJSON danh sách bác sĩ")
+    parser.add_argument('--patients', help="File JSON hoặc NDJSON danh sách bệnh nhân")
+    parser.add_argument('--snapshot', metavar='DIR',
+                        help="Đọc bác sĩ, bệnh nhân và lịch từ snapshot nhị phân thay cho --doctors/--patients")
+    parser.add_argument('--save-snapshot', metavar='DIR', help="Ghi dữ liệu đã nạp thành snapshot nhị phân")
+    parser.add_argument('--output', default='-', help="File JSON kết quả ('-' = stdout)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--population-size', type=int, default=POPULATION_SIZE)
+    parser.add_argument('--mutation-chance', type=float, default=MUTATION_CHANCE)
+    parser.add_argument('--iterations', type=int, default=ITERATIONS_LIMIT)
+    parser.add_argument('--elite-size', type=int, default=ELITE_SIZE)
+    parser.add_argument('--tournament-size', type=int, default=TOURNAMENT_SIZE)
+    parser.add_argument('--stagnation-limit', type=int, default=STAGNATION_LIMIT, help="0 = tắt dừng sớm")
+    parser.add_argument('--greedy-fraction', type=float, default=GREEDY_SEED_FRACTION,
+                        help="Tỉ lệ quần thể ban đầu xếp tham lam theo độ ưu tiên (0 = ngẫu nhiên hoàn toàn)")
+    parser.add_argument('--memetic-rate', type=float, default=MEMETIC_RATE,
+                        help="Tỉ lệ cá thể con được sửa lỗi và tìm kiếm cục bộ (0 = tắt)")
+    parser.add_argument('--time-limit', type=float, default=None, help="Giới hạn thời gian (giây)")
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS',
+                        help="Giải trong đúng số giây này và trả lịch tốt nhất tìm được; tự chỉnh kích thước "
+                             "quần thể và tỉ lệ đột biến (bỏ qua --population-size, --mutation-chance, "
+                             "--iterations)")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="Số tiến trình (mô hình đảo khi > 1)")
+    parser.add_argument('--decompose', action='store_true', default=DECOMPOSE_BY_SPECIALTY,
+                        help="Giải riêng từng chuyên khoa rồi ghép lại")
+    parser.add_argument('--weeks', type=int, default=WEEKS, help="Số tuần trong kỳ lập lịch")
+    parser.add_argument('--days', default=','.join(DAYS), help="Các ngày làm việc trong tuần, cách nhau bởi dấu phẩy")
+    parser.add_argument('--shifts', default=','.join(SHIFTS), help="Các ca trong ngày, cách nhau bởi dấu phẩy")
+    parser.add_argument('--slots-per-shift', type=int, default=SLOT_PER_SHIFT)
+    parser.add_argument('--slot-minutes', type=int, default=SLOT_MINUTES, help="Độ dài một khung giờ (phút)")
+    parser.add_argument('--previous', metavar='PATH',
+                        help="Kết quả JSON lần chạy trước: chỉ xếp lại bệnh nhân bị ảnh hưởng")
+    parser.add_argument('--cache', metavar='DIR',
+                        help="Thư mục lưu kết quả: chạy lại cùng dữ liệu và tham số sẽ lấy ngay kết quả cũ")
+    parser.add_argument('--cache-size', type=int, default=RESULT_CACHE_SIZE, help="Số kết quả tối đa trong --cache")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Ghi số liệu đo đạc: .jsonl = JSON lines, còn lại = Chrome trace")
+    return parser
+
+def build_calendar(args):
+    return Calendar(days=[day.strip() for day in args.days.split(',') if day.strip()],
+                    shifts=[shift.strip() for shift in args.shifts.split(',') if shift.strip()],
+                    slots_per_shift=args.slots_per_shift, weeks=args.weeks, slot_minutes=args.slot_minutes)
+
+def run_batch(args):
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.snapshot:
+        snapshot = open_snapshot(args.snapshot)
+        calendar, doctors, patients = snapshot.calendar, snapshot.doctors, snapshot.patients
+    else:
+        calendar = build_calendar(args)
+        doctors = load_doctors(args.doctors)
+        patients = load_patients(args.patients)
+    previous = load_json(args.previous) if args.previous else None
+    if previous:
+        # Rescheduling needs the same off shifts as the run it continues from
+        for doc in doctors:
+            if not has_doctor_schedule(doc) and doc.get('name') in previous.get('off_shifts', {}):
+                set_doctor_off_shifts(doc, previous['off_shifts'][doc['name']], calendar)
+    # Keep schedules that come with the input, generate the rest
+    generate_doctor_schedule([doc for doc in doctors if not has_doctor_schedule(doc)], calendar, args.seed)
+    if args.save_snapshot:
+        save_snapshot(args.save_snapshot, doctors, patients, calendar)
+
+    profiler = SolverProfiler() if args.profile else None
+    cache = ResultCache(args.cache, args.cache_size) if args.cache else None
+    started = time.monotonic()
+    if previous:
+        # Older result files have no input_patients; then every patient without an assignment is affected
+        result = reschedule(doctors, patients,
+                            {record['patient_id']: (record['slot'], record['doctor'])
+                             for record in previous['schedule']},
+                            previous.get('input_patients'), profiler=profiler, calendar=calendar)
+    else:
+        result = solve(doctors, patients,
+                       workers=args.workers,
+                       decompose=args.decompose,
+                       seed=args.seed or 0,
+                       population_size=args.population_size,
+                       mutation_chance=args.mutation_chance,
+                       elite_size=args.elite_size,
+                       tournament_size=args.tournament_size,
+                       iterations_limit=args.iterations,
+                       stagnation_limit=args.stagnation_limit,
+                       time_limit=args.time_limit,
+                       greedy_fraction=args.greedy_fraction,
+                       memetic_rate=args.memetic_rate,
+                       profiler=profiler,
+                       calendar=calendar,
+                       cache=cache,
+                       time_budget=args.budget)
+    elapsed = time.monotonic() - started
+    if profiler:
+        profiler.write(args.profile)
+
+    output = schedule_output(result, doctors, patients, calendar, elapsed)
+    # The patients as solved, so a later --previous run can tell edited and cancelled ones apart
+    output['input_patients'] = list(patients)
+    text = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    cached = " (lấy từ bộ đệm)" if cache and cache.hits else ""
+    if result.cache_stats:
+        cached += f", bộ đệm điểm trúng {result.cache_stats['hit_rate']:.0%}"
+    print(f"{output['assigned']}/{len(patients)} bệnh nhân được xếp lịch, điểm {result.value:.2f}, "
+          f"{result.generations} thế hệ, {elapsed:.2f}s{cached}", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if not args.doctors and not args.patients and not args.snapshot:
+        # The GUI and wxPython are only imported when actually needed
+        from lichlamviec_gui import run_gui
+        run_gui()
+        return 0
+    if args.snapshot and (args.doctors or args.patients):
+        build_arg_parser().error("--snapshot thay cho --doctors/--patients")
+    if not args.snapshot and (not args.doctors or not args.patients):
+        build_arg_parser().error("--doctors và --patients phải đi cùng nhau")
+    if args.cache_size < 1:
+        build_arg_parser().error("--cache-size phải lớn hơn 0")
+    if args.budget is not None:
+        if args.budget <= 0:
+            build_arg_parser().error("--budget phải lớn hơn 0")
+        if args.workers != 1 or args.decompose or args.previous:
+            build_arg_parser().error("--budget không dùng cùng --workers, --decompose hoặc --previous")
+    try:
+        build_calendar(args)
+    except ValueError as exc:
+        build_arg_parser().error(str(exc))
+    return run_batch(args)
 
 if __name__ == '__main__':
-    app = MedicalSchedulerApp()
-    app.MainLoop()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Lichlamviec1 import (
+    DEFAULT_CALENDAR, Calendar, FitnessCache, GeneticSolver, ScheduleProblem, generate_doctor_schedule,
+)
+
+# -------------------- CONSTANTS --------------------
+SPECIALTIES = ['Tim mạch', 'Thần kinh', 'Xương khớp', 'Da liễu', 'Mắt', 'Nhi', 'Tai mũi họng', 'Nội tiết']
+DEFAULT_SCALES = ['10x100', '50x1000', '200x10000']
+FULL_SCALES = DEFAULT_SCALES + ['1000x100000']
+DEFAULT_DURATIONS = '15:3,30:4,45:2,60:1'
+# Records of an earlier run match a scale on these fields when used as --reference
+REFERENCE_KEY = ('n_doctors', 'n_patients', 'specialties', 'specialty_skew', 'durations', 'free_slot_density',
+                 'weeks', 'seed', 'population_size')
+
+# -------------------- WORKLOAD GENERATOR --------------------
+def parse_durations(text):
+    mix = {}
+    for item in text.split(','):
+        duration, weight = item.split(':')
+        mix[int(duration)] = float(weight)
+    return mix
+
+def generate_workload(n_doctors, n_patients, n_specialties=5, specialty_skew=0.0,
+                      duration_mix=None, free_slot_density=0.05, seed=0, calendar=DEFAULT_CALENDAR):
+    rng = random.Random(seed)
+    specialties = [SPECIALTIES[i] if i < len(SPECIALTIES) else f"Chuyên khoa {i + 1}"
+                   for i in range(max(1, n_specialties))]
+    # skew 0 = uniform mix, larger values concentrate patients on the first specialties
+    weights = [1.0 / (rank + 1) ** specialty_skew for rank in range(len(specialties))]
+    duration_mix = duration_mix or parse_durations(DEFAULT_DURATIONS)
+
+    doctors = [{'id': i + 1, 'name': f"BS {i + 1:04d}", 'specialty': specialties[i % len(specialties)]}
+               for i in range(n_doctors)]
+    generate_doctor_schedule(doctors, calendar, seed=seed)
+
+    n_free = max(1, round(free_slot_density * calendar.total_slots))
+    patients = []
+    for i in range(n_patients):
+        patients.append({
+            'id': i + 1,
+            'specialty': rng.choices(specialties, weights)[0],
+            'priority': rng.randint(1, 10),
+            'duration': rng.choices(list(duration_mix), list(duration_mix.values()))[0],
+            'free_slots': [str(s) for s in sorted(rng.sample(range(calendar.total_slots), n_free))],
+        })
+    return doctors, patients
+
+# -------------------- MEASUREMENTS --------------------
+def throughput(operation, min_time=0.5, max_calls=1000000):
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time and calls < max_calls:
+        operation()
+        calls += 1
+        elapsed = time.perf_counter() - started
+    return calls / elapsed if elapsed else float('inf')
+
+def load_reference(path):
+    references = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                references[tuple(record.get(field) for field in REFERENCE_KEY)] = record
+    return references
+
+def measure_scale(n_doctors, n_patients, args, references=None):
+    calendar = Calendar(weeks=args.weeks)
+    doctors, patients = generate_workload(n_doctors, n_patients, args.specialties, args.specialty_skew,
+                                          parse_durations(args.durations), args.free_slot_density, args.seed,
+                                          calendar)
+    random.seed(args.seed)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    problem = ScheduleProblem(doctors, patients, cache_size=0, calendar=calendar)
+    build_seconds = time.perf_counter() - started
+    population = [problem.generate_random_state() for _ in range(args.population_size)]
+    problem.evaluate_population(population)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    value_rate = throughput(lambda: problem.value(random.choice(population)), args.min_time)
+    batch_rate = throughput(lambda: problem.evaluate_population(population), args.min_time) * len(population)
+    mutate_rate = throughput(lambda: problem.mutate(random.choice(population)), args.min_time)
+    crossover_rate = throughput(lambda: problem.crossover(*random.sample(population, 2)), args.min_time)
+
+    # Time to target. Only an absolute target (--target-fitness, or the target recorded for the same
+    # scale and seed by a --reference run) compares versions: the default, a fraction of the way from
+    # this run's initial best to its own final best, is reached just as fast by a version that
+    # converges to a worse schedule. The throughputs above are uncached; the GA runs with a fitness
+    # cache as solve() does, so its hit rate is recorded too.
+    problem.cache = FitnessCache()
+    solver = GeneticSolver(problem, population_size=args.population_size)
+    solver.initialize(population)
+    trajectory = []
+    ga_started = time.perf_counter()
+    result = solver.run(iterations_limit=args.generations, stagnation_limit=None, time_limit=args.ga_time_limit,
+                        callback=lambda generation, best, mean: trajectory.append(
+                            (time.perf_counter() - ga_started, best)))
+    ga_seconds = time.perf_counter() - ga_started
+    initial_best = float(np.max(problem.evaluate_population(population)))
+    key = (n_doctors, n_patients, args.specialties, args.specialty_skew, args.durations, args.free_slot_density,
+           args.weeks, args.seed, args.population_size)
+    reference = (references or {}).get(key)
+    if args.target_fitness is not None:
+        target, target_source = args.target_fitness, 'absolute'
+    elif reference is not None:
+        target, target_source = reference['target_fitness'], 'reference'
+    else:
+        target, target_source = initial_best + args.target_ratio * (result.value - initial_best), 'relative'
+    time_to_target = next((elapsed for elapsed, best in trajectory if best >= target), None)
+
+    return {
+        'n_doctors': n_doctors,
+        'n_patients': n_patients,
+        'specialties': args.specialties,
+        'specialty_skew': args.specialty_skew,
+        'durations': args.durations,
+        'free_slot_density': args.free_slot_density,
+        'weeks': args.weeks,
+        'total_slots': calendar.total_slots,
+        'seed': args.seed,
+        'population_size': args.population_size,
+        'build_seconds': round(build_seconds, 6),
+        'value_evals_per_sec': round(value_rate, 2),
+        'batch_evals_per_sec': round(batch_rate, 2),
+        'mutate_per_sec': round(mutate_rate, 2),
+        'crossover_per_sec': round(crossover_rate, 2),
+        'ga_generations': result.generations,
+        'ga_seconds': round(ga_seconds, 6),
+        'cache_hit_rate': round(result.cache_stats['hit_rate'], 4),
+        'initial_fitness': initial_best,
+        'best_fitness': result.value,
+        'target_fitness': target,
+        'target_source': target_source,
+        'reached_target': time_to_target is not None,
+        'time_to_target': None if time_to_target is None else round(time_to_target, 6),
+        'peak_memory_bytes': peak_memory,
+    }
+
+# -------------------- COMMAND LINE --------------------
+def parse_scale(text):
+    n_doctors, n_patients = text.lower().split('x')
+    return int(n_doctors), int(n_patients)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo hiệu năng ScheduleProblem và GA trên dữ liệu sinh ngẫu nhiên. "
+                                                 "Ghi mỗi quy mô một đối tượng JSON (JSON lines).")
+    parser.add_argument('--scale', action='append', type=parse_scale,
+                        help="BÁC_SĨxBỆNH_NHÂN, lặp lại được (mặc định: %s)" % ' '.join(DEFAULT_SCALES))
+    parser.add_argument('--full', action='store_true', help="Thêm quy mô 1000x100000")
+    parser.add_argument('--specialties', type=int, default=5, help="Số chuyên khoa")
+    parser.add_argument('--specialty-skew', type=float, default=0.0,
+                        help="Độ lệch phân bố bệnh nhân theo chuyên khoa (0 = đều)")
+    parser.add_argument('--durations', default=DEFAULT_DURATIONS, help="THỜI_LƯỢNG:TRỌNG_SỐ,...")
+    parser.add_argument('--free-slot-density', type=float, default=0.05,
+                        help="Tỉ lệ khung giờ trong kỳ mà mỗi bệnh nhân rảnh")
+    parser.add_argument('--weeks', type=int, default=1, help="Số tuần trong kỳ lập lịch")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--population-size', type=int, default=50)
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--ga-time-limit', type=float, default=60.0, help="Giới hạn thời gian chạy GA (giây)")
+    parser.add_argument('--target-ratio', type=float, default=0.9,
+                        help="Không có mục tiêu tuyệt đối: mục tiêu nằm ở tỉ lệ này từ điểm ban đầu đến điểm "
+                             "cuối của chính lần chạy (không so sánh được giữa các phiên bản)")
+    parser.add_argument('--target-fitness', type=float, default=None,
+                        help="Điểm mục tiêu tuyệt đối cho time_to_target, dùng cho mọi quy mô")
+    parser.add_argument('--reference', metavar='PATH',
+                        help="File JSON lines của một lần chạy trước (phiên bản gốc); mỗi quy mô dùng "
+                             "target_fitness đã ghi cho cùng quy mô, seed và tham số")
+    parser.add_argument('--min-time', type=float, default=0.5, help="Số giây cho mỗi phép đo thông lượng")
+    parser.add_argument('--output', default='-', help="File JSON lines kết quả ('-' = stdout)")
+    args = parser.parse_args(argv)
+    references = load_reference(args.reference) if args.reference else None
+
+    scales = args.scale or [parse_scale(scale) for scale in (FULL_SCALES if args.full else DEFAULT_SCALES)]
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine()}
+    out = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    try:
+        for n_doctors, n_patients in scales:
+            record = dict(meta, **measure_scale(n_doctors, n_patients, args, references))
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
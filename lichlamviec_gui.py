@@ -0,0 +1,608 @@
+import wx
+import wx.grid
+import threading
+import os
+import numpy as np
+
+from Lichlamviec1 import (
+    DAYS, SHIFTS, SLOT_PER_SHIFT, SLOT_PER_DAY, TOTAL_SLOTS, MAX_PATIENTS_PER_SHIFT,
+    POPULATION_SIZE, MUTATION_CHANCE, ITERATIONS_LIMIT, RESCHEDULE_GENERATIONS, ISLAND_SEED,
+    AvailabilityIndex, ResultCache, SolverResult, ThrottledCallback, generate_doctor_schedule, get_day_shift_slot,
+    is_doctor_working, load_doctors, load_patients, reschedule, schedule_assignments, solve,
+)
+
+# -------------------- wxPython GUI --------------------
+
+SCHEDULE_COLUMNS = ["Ngày", "Ca", "Bệnh nhân", "Bác sĩ", "Slot", "Ưu tiên"]
+SCHEDULE_COLUMN_SIZES = [80, 80, 100, 120, 60, 80]
+
+class ScheduleTable(wx.grid.GridTableBase):
+    # Virtual table over the result state: rows are formatted only when the grid asks for them,
+    # sorting and filtering just reorder self.view (positions into the per-assignment arrays)
+    def __init__(self):
+        super().__init__()
+        self.patients = []
+        self.doctors = []
+        self.patient_idx = np.zeros(0, dtype=np.int64)
+        self.doc_idx = np.zeros(0, dtype=np.int64)
+        self.slots = np.zeros(0, dtype=np.int64)
+        self.priorities = np.zeros(0)
+        self.name_rank = np.zeros(0, dtype=np.int64)
+        self.view = np.zeros(0, dtype=np.int64)
+        self.sort_col = None
+        self.ascending = True
+        self.day = None
+        self.doctor = None
+        self.min_priority = None
+        self.attr = wx.grid.GridCellAttr()
+        self.attr.SetAlignment(wx.ALIGN_CENTER, wx.ALIGN_CENTER)
+
+    def set_result(self, result, patients, doctors):
+        self.patients = patients
+        self.doctors = doctors
+        state = np.asarray(result.state, dtype=np.int64)[:len(patients)]
+        self.patient_idx = np.flatnonzero((state >= 0) & (state < len(doctors) * TOTAL_SLOTS))
+        self.doc_idx, self.slots = np.divmod(state[self.patient_idx], TOTAL_SLOTS)
+        self.priorities = np.array([patients[i].get('priority', 1) for i in self.patient_idx], dtype=float)
+        order = sorted(range(len(doctors)), key=lambda d: doctors[d]['name'])
+        self.name_rank = np.empty(len(doctors), dtype=np.int64)
+        self.name_rank[order] = np.arange(len(doctors))
+        self.refresh_view()
+
+    def set_filter(self, day=None, doctor=None, min_priority=None):
+        self.day = day
+        self.doctor = doctor
+        self.min_priority = min_priority
+        self.refresh_view()
+
+    def sort(self, col, ascending=True):
+        self.sort_col = col
+        self.ascending = ascending
+        self.refresh_view()
+
+    def sort_key(self, col):
+        slots = self.slots
+        if col == 1:
+            return (slots % SLOT_PER_DAY) // SLOT_PER_SHIFT * TOTAL_SLOTS + slots
+        if col == 2:
+            return self.patient_idx
+        if col == 3:
+            return self.name_rank[self.doc_idx] * TOTAL_SLOTS + slots
+        if col == 4:
+            return slots % SLOT_PER_SHIFT
+        if col == 5:
+            return self.priorities
+        return slots
+
+    def refresh_view(self):
+        mask = np.ones(len(self.patient_idx), dtype=bool)
+        if self.day is not None:
+            mask &= self.slots // SLOT_PER_DAY == self.day
+        if self.doctor is not None:
+            names = [d for d, doctor in enumerate(self.doctors) if doctor['name'] == self.doctor]
+            mask &= np.isin(self.doc_idx, names)
+        if self.min_priority is not None:
+            mask &= self.priorities >= self.min_priority
+        view = np.flatnonzero(mask)
+        if self.sort_col is not None:
+            key = self.sort_key(self.sort_col)[view]
+            view = view[np.argsort(key if self.ascending else -key, kind='stable')]
+        self.view = view
+
+    def GetNumberRows(self):
+        return len(self.view)
+
+    def GetNumberCols(self):
+        return len(SCHEDULE_COLUMNS)
+
+    def GetColLabelValue(self, col):
+        return SCHEDULE_COLUMNS[col]
+
+    def IsEmptyCell(self, row, col):
+        return False
+
+    def GetValue(self, row, col):
+        pos = self.view[row]
+        i = int(self.patient_idx[pos])
+        patient = self.patients[i]
+        day, shift, time_slot = get_day_shift_slot(int(self.slots[pos]))
+        values = (day, shift, f"BN{patient.get('id', i+1)}", self.doctors[int(self.doc_idx[pos])]['name'],
+                  str(time_slot), str(patient.get('priority', 1)))
+        return values[col]
+
+    def SetValue(self, row, col, value):
+        pass
+
+    def GetAttr(self, row, col, kind):
+        self.attr.IncRef()
+        return self.attr
+
+class ScheduleGrid(wx.grid.Grid):
+    def __init__(self, parent):
+        super().__init__(parent)
+        
+        self.table = ScheduleTable()
+        self.SetTable(self.table, True)
+        
+        for col, width in enumerate(SCHEDULE_COLUMN_SIZES):
+            self.SetColSize(col, width)
+        
+        # Make grid read-only, click a column label to sort
+        self.EnableEditing(False)
+        self.Bind(wx.grid.EVT_GRID_LABEL_LEFT_CLICK, self.on_label_click)
+
+    def update_schedule(self, result, patients, doctors):
+        old_rows = self.table.GetNumberRows()
+        self.table.set_result(result, patients, doctors)
+        self.refresh_rows(old_rows)
+
+    def set_filter(self, day=None, doctor=None, min_priority=None):
+        old_rows = self.table.GetNumberRows()
+        self.table.set_filter(day, doctor, min_priority)
+        self.refresh_rows(old_rows)
+
+    def on_label_click(self, event):
+        col = event.GetCol()
+        if col < 0:
+            event.Skip()
+            return
+        ascending = not (self.table.sort_col == col and self.table.ascending)
+        self.table.sort(col, ascending)
+        self.SetSortingColumn(col, ascending)
+        self.ForceRefresh()
+
+    def refresh_rows(self, old_rows):
+        # Only the row count is sent to the grid; cell values are pulled from the table on paint
+        new_rows = self.table.GetNumberRows()
+        self.BeginBatch()
+        if new_rows < old_rows:
+            self.ProcessTableMessage(wx.grid.GridTableMessage(
+                self.table, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, new_rows, old_rows - new_rows))
+        elif new_rows > old_rows:
+            self.ProcessTableMessage(wx.grid.GridTableMessage(
+                self.table, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, new_rows - old_rows))
+        self.EndBatch()
+        self.ForceRefresh()
+
+class WorkloadList(wx.ListCtrl):
+    # Virtual report list: one row per doctor, one column per day/shift; rows are rendered on demand
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.LC_HRULES | wx.LC_VRULES)
+        self.n_shifts = len(DAYS) * len(SHIFTS)
+        self.doctors = []
+        self.patients = []
+        self.counts = np.zeros((0, self.n_shifts), dtype=np.int64)
+        self.working = np.zeros((0, self.n_shifts), dtype=bool)
+        self.limits = np.zeros(0, dtype=np.int64)
+        self.doc_idx = np.zeros(0, dtype=np.int64)
+        self.shift_idx = np.zeros(0, dtype=np.int64)
+        self.patient_idx = np.zeros(0, dtype=np.int64)
+        
+        self.over_attr = wx.ItemAttr()
+        self.over_attr.SetTextColour(wx.Colour(255, 0, 0))  # Red
+        self.free_attr = wx.ItemAttr()
+        self.free_attr.SetTextColour(wx.Colour(0, 128, 0))  # Green
+        self.off_attr = wx.ItemAttr()
+        self.off_attr.SetTextColour(wx.Colour(128, 128, 128))
+        
+        self.InsertColumn(0, "Bác sĩ", width=160)
+        for day in DAYS:
+            for shift in SHIFTS:
+                self.InsertColumn(self.GetColumnCount(), f"{day} ({shift})", wx.LIST_FORMAT_CENTER, 90)
+        self.InsertColumn(self.GetColumnCount(), "Tổng", wx.LIST_FORMAT_CENTER, 60)
+
+    def set_result(self, result, doctors, patients):
+        self.doctors = doctors
+        self.patients = patients
+        state = np.asarray(result.state, dtype=np.int64)[:len(patients)]
+        self.patient_idx = np.flatnonzero((state >= 0) & (state < len(doctors) * TOTAL_SLOTS))
+        self.doc_idx, slots = np.divmod(state[self.patient_idx], TOTAL_SLOTS)
+        self.shift_idx = slots // SLOT_PER_SHIFT
+        self.counts = np.bincount(self.doc_idx * self.n_shifts + self.shift_idx,
+                                  minlength=len(doctors) * self.n_shifts).reshape(len(doctors), self.n_shifts)
+        self.limits = np.array([doctor.get('max_patients_per_shift', MAX_PATIENTS_PER_SHIFT) for doctor in doctors],
+                               dtype=np.int64)
+        self.working = np.array([[is_doctor_working(doctor, day_idx, shift_idx)
+                                  for day_idx in range(len(DAYS)) for shift_idx in range(len(SHIFTS))]
+                                 for doctor in doctors], dtype=bool).reshape(len(doctors), self.n_shifts)
+        self.SetItemCount(len(doctors))
+        self.Refresh()
+
+    def shift_patients(self, item, shift):
+        rows = self.patient_idx[(self.doc_idx == item) & (self.shift_idx == shift)]
+        return [f"BN{self.patients[i].get('id', i+1)}" for i in rows]
+
+    def OnGetItemText(self, item, column):
+        if column == 0:
+            return self.doctors[item]['name']
+        if column > self.n_shifts:
+            return str(self.counts[item][self.working[item]].sum())
+        shift = column - 1
+        if not self.working[item, shift]:
+            return "Nghỉ"
+        count = self.counts[item, shift]
+        limit = self.limits[item]
+        status = "⚠️" if count > limit else "✅"
+        return f"{count}/{limit} {status}"
+
+    def OnGetItemAttr(self, item):
+        return None
+
+    def OnGetItemColumnAttr(self, item, column):
+        if column == 0 or column > self.n_shifts:
+            return None
+        shift = column - 1
+        if not self.working[item, shift]:
+            return self.off_attr
+        count = self.counts[item, shift]
+        if count > self.limits[item]:
+            return self.over_attr
+        return self.free_attr if count == 0 else None
+
+class DoctorWorkloadPanel(wx.Panel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        
+        self.sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        title = wx.StaticText(self, label=f"TỔNG KẾT CÔNG VIỆC CÁC BÁC SĨ (Giới hạn BN/buổi theo từng bác sĩ, mặc định {MAX_PATIENTS_PER_SHIFT})")
+        title.SetFont(wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        self.sizer.Add(title, 0, wx.ALL, 10)
+        
+        self.workload_list = WorkloadList(self)
+        self.sizer.Add(self.workload_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        
+        # Patient lists of the selected doctor
+        self.detail_text = wx.TextCtrl(self, style=wx.TE_MULTILINE | wx.TE_READONLY, size=(-1, 120))
+        self.sizer.Add(self.detail_text, 0, wx.EXPAND | wx.ALL, 10)
+        
+        self.SetSizer(self.sizer)
+        self.workload_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_doctor_selected)
+        
+    def update_workload(self, result, doctors, patients):
+        self.workload_list.set_result(result, doctors, patients)
+        self.detail_text.SetValue("")
+
+    def on_doctor_selected(self, event):
+        workload = self.workload_list
+        item = event.GetIndex()
+        doctor = workload.doctors[item]
+        
+        lines = [f"Bác sĩ {doctor['name']} (tối đa {workload.limits[item]} BN/buổi):"]
+        if doctor.get('off_shifts'):
+            off_day_idx, off_shift_idx, _ = doctor['off_shifts'][0]
+            lines.append(f"  Nghỉ: {DAYS[off_day_idx]} ({SHIFTS[off_shift_idx]})")
+        for shift in range(workload.n_shifts):
+            if workload.working[item, shift] and workload.counts[item, shift]:
+                day_idx, shift_idx = divmod(shift, len(SHIFTS))
+                lines.append(f"  {DAYS[day_idx]} ({SHIFTS[shift_idx]}): {', '.join(workload.shift_patients(item, shift))}")
+        lines.append(f"  → Tổng: {workload.counts[item][workload.working[item]].sum()} bệnh nhân")
+        self.detail_text.SetValue("\n".join(lines))
+
+class MainFrame(wx.Frame):
+    def __init__(self):
+        super().__init__(parent=None, title="Hệ thống lập lịch khám bệnh", size=(1000, 700))
+        
+        self.doctors = []
+        self.patients = []
+        self.availability = AvailabilityIndex()
+        self.result = None
+        self.result_cache = ResultCache()
+        self.from_cache = False
+        # Last schedule by patient id, the starting point for rescheduling
+        self.previous_assignments = None
+        self.previous_patients = None
+        self.stop_event = threading.Event()
+        
+        self.create_menu()
+        self.create_ui()
+        self.create_status_bar()
+        
+        self.Center()
+
+    def create_menu(self):
+        menubar = wx.MenuBar()
+        
+        # File menu
+        file_menu = wx.Menu()
+        load_item = file_menu.Append(wx.ID_OPEN, "&Tải dữ liệu\tCtrl+O", "Tải dữ liệu từ file JSON")
+        run_item = file_menu.Append(wx.ID_ANY, "&Chạy thuật toán\tCtrl+R", "Chạy thuật toán tối ưu")
+        file_menu.AppendSeparator()
+        exit_item = file_menu.Append(wx.ID_EXIT, "&Thoát\tCtrl+Q", "Thoát chương trình")
+        
+        menubar.Append(file_menu, "&File")
+        
+        # Bind events
+        self.Bind(wx.EVT_MENU, self.on_load_data, load_item)
+        self.Bind(wx.EVT_MENU, self.on_run_algorithm, run_item)
+        self.Bind(wx.EVT_MENU, self.on_exit, exit_item)
+        
+        self.SetMenuBar(menubar)
+
+    def create_ui(self):
+        panel = wx.Panel(self)
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        # Control panel
+        control_panel = wx.Panel(panel)
+        control_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        
+        self.load_btn = wx.Button(control_panel, label="Tải dữ liệu")
+        self.run_btn = wx.Button(control_panel, label="Chạy thuật toán")
+        self.run_btn.Enable(False)
+        
+        control_sizer.Add(self.load_btn, 0, wx.ALL, 5)
+        control_sizer.Add(self.run_btn, 0, wx.ALL, 5)
+        
+        self.stop_btn = wx.Button(control_panel, label="Dừng")
+        self.stop_btn.Enable(False)
+        control_sizer.Add(self.stop_btn, 0, wx.ALL, 5)
+        
+        # Same seed and data give the same off shifts and schedule, served from the result cache
+        control_sizer.Add(wx.StaticText(control_panel, label="Seed:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 5)
+        self.seed_ctrl = wx.SpinCtrl(control_panel, min=0, max=2 ** 31 - 1, initial=ISLAND_SEED)
+        control_sizer.Add(self.seed_ctrl, 0, wx.ALL, 5)
+        
+        self.reschedule_check = wx.CheckBox(control_panel, label="Chỉ xếp lại phần thay đổi")
+        self.reschedule_check.Enable(False)
+        control_sizer.Add(self.reschedule_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        
+        # Progress bar
+        self.progress = wx.Gauge(control_panel, range=100)
+        control_sizer.Add(self.progress, 1, wx.ALL | wx.EXPAND, 5)
+        
+        control_panel.SetSizer(control_sizer)
+        
+        # Notebook for tabs
+        self.notebook = wx.Notebook(panel)
+        
+        # Schedule tab
+        schedule_panel = wx.Panel(self.notebook)
+        schedule_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        # Filters
+        filter_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.day_filter = wx.Choice(schedule_panel, choices=["Tất cả ngày"] + DAYS)
+        self.doctor_filter = wx.Choice(schedule_panel, choices=["Tất cả bác sĩ"])
+        self.priority_filter = wx.SpinCtrl(schedule_panel, min=0, max=100, initial=0)
+        self.day_filter.SetSelection(0)
+        self.doctor_filter.SetSelection(0)
+        
+        filter_sizer.Add(wx.StaticText(schedule_panel, label="Ngày:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        filter_sizer.Add(self.day_filter, 0, wx.ALL, 5)
+        filter_sizer.Add(wx.StaticText(schedule_panel, label="Bác sĩ:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        filter_sizer.Add(self.doctor_filter, 0, wx.ALL, 5)
+        filter_sizer.Add(wx.StaticText(schedule_panel, label="Ưu tiên ≥"), 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        filter_sizer.Add(self.priority_filter, 0, wx.ALL, 5)
+        schedule_sizer.Add(filter_sizer, 0, wx.EXPAND)
+        
+        self.schedule_grid = ScheduleGrid(schedule_panel)
+        schedule_sizer.Add(self.schedule_grid, 1, wx.EXPAND | wx.ALL, 5)
+        
+        schedule_panel.SetSizer(schedule_sizer)
+        self.notebook.AddPage(schedule_panel, "Lịch khám")
+        
+        # Workload tab
+        self.workload_panel = DoctorWorkloadPanel(self.notebook)
+        self.notebook.AddPage(self.workload_panel, "Công việc bác sĩ")
+        
+        # Summary tab
+        summary_panel = wx.Panel(self.notebook)
+        summary_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        self.summary_text = wx.TextCtrl(summary_panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
+        summary_sizer.Add(self.summary_text, 1, wx.EXPAND | wx.ALL, 5)
+        
+        summary_panel.SetSizer(summary_sizer)
+        self.notebook.AddPage(summary_panel, "Tóm tắt")
+        
+        # Add to main sizer
+        main_sizer.Add(control_panel, 0, wx.EXPAND | wx.ALL, 5)
+        main_sizer.Add(self.notebook, 1, wx.EXPAND | wx.ALL, 5)
+        
+        panel.SetSizer(main_sizer)
+        
+        # Bind events
+        self.load_btn.Bind(wx.EVT_BUTTON, self.on_load_data)
+        self.run_btn.Bind(wx.EVT_BUTTON, self.on_run_algorithm)
+        self.stop_btn.Bind(wx.EVT_BUTTON, self.on_stop_algorithm)
+        self.day_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        self.doctor_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        self.priority_filter.Bind(wx.EVT_SPINCTRL, self.on_filter_changed)
+
+    def create_status_bar(self):
+        self.statusbar = self.CreateStatusBar()
+        self.statusbar.SetStatusText("Sẵn sàng")
+
+    def on_load_data(self, event):
+        try:
+            # Check if files exist
+            if not os.path.exists('doctor.json') or not os.path.exists('patin.json'):
+                wx.MessageBox("Không tìm thấy file doctor.json hoặc patin.json", 
+                             "Lỗi", wx.OK | wx.ICON_ERROR)
+                return
+            
+            previous_doctors = {doctor['name']: doctor for doctor in self.doctors}
+            self.doctors = load_doctors('doctor.json')
+            self.patients = load_patients('patin.json')
+            
+            # Generate doctor schedules, keeping the known ones when only the changes are rescheduled
+            if not self.reschedule_check.GetValue():
+                previous_doctors = {}
+            for doctor in self.doctors:
+                if doctor['name'] in previous_doctors:
+                    doctor['off_shifts'] = previous_doctors[doctor['name']]['off_shifts']
+                    doctor['free_ranges'] = previous_doctors[doctor['name']]['free_ranges']
+            generate_doctor_schedule([doctor for doctor in self.doctors if doctor['name'] not in previous_doctors],
+                                     seed=self.seed_ctrl.GetValue())
+            self.availability.reset(self.doctors)
+            
+            self.doctor_filter.Set(["Tất cả bác sĩ"] + sorted({doctor['name'] for doctor in self.doctors}))
+            self.doctor_filter.SetSelection(0)
+            
+            self.run_btn.Enable(True)
+            self.statusbar.SetStatusText(f"Đã tải {len(self.doctors)} bác sĩ và {len(self.patients)} bệnh nhân")
+            
+            # Update summary
+            summary = f"=== THÔNG TIN DỮ LIỆU ===\n"
+            summary += f"Số bác sĩ: {len(self.doctors)}\n"
+            summary += f"Số bệnh nhân: {len(self.patients)}\n\n"
+            summary += "=== LỊCH NGHỈ CÁC BÁC SĨ ===\n"
+            
+            for doctor in self.doctors:
+                if doctor.get('off_shifts'):
+                    off_day_idx, off_shift_idx, _ = doctor['off_shifts'][0]
+                    off_day_name = DAYS[off_day_idx]
+                    off_shift_name = SHIFTS[off_shift_idx]
+                    summary += f"Bác sĩ {doctor['name']} nghỉ: {off_day_name} ({off_shift_name})\n"
+            
+            self.summary_text.SetValue(summary)
+            
+        except Exception as e:
+            wx.MessageBox(f"Lỗi khi tải dữ liệu: {str(e)}", "Lỗi", wx.OK | wx.ICON_ERROR)
+
+    def on_filter_changed(self, event):
+        day = self.day_filter.GetSelection()
+        doctor = self.doctor_filter.GetSelection()
+        min_priority = self.priority_filter.GetValue()
+        self.schedule_grid.set_filter(
+            day=day - 1 if day > 0 else None,
+            doctor=self.doctor_filter.GetString(doctor) if doctor > 0 else None,
+            min_priority=min_priority if min_priority > 0 else None)
+
+    def on_run_algorithm(self, event):
+        if not self.doctors or not self.patients:
+            wx.MessageBox("Vui lòng tải dữ liệu trước", "Thông báo", wx.OK | wx.ICON_WARNING)
+            return
+        
+        # Disable button during processing
+        self.run_btn.Enable(False)
+        self.stop_btn.Enable(True)
+        self.stop_event.clear()
+        self.statusbar.SetStatusText("Đang chạy thuật toán...")
+        
+        # Widgets are read here on the main thread; the worker thread only gets plain values
+        rescheduling = self.reschedule_check.GetValue() and self.previous_assignments is not None
+        seed = self.seed_ctrl.GetValue()
+        # Run algorithm in separate thread
+        thread = threading.Thread(target=self.run_genetic_algorithm, args=(rescheduling, seed))
+        thread.daemon = True
+        thread.start()
+
+    def on_stop_algorithm(self, event):
+        # The solver checks the flag once per generation and returns the best schedule so far
+        self.stop_event.set()
+        self.stop_btn.Enable(False)
+        self.statusbar.SetStatusText("Đang dừng...")
+
+    def run_genetic_algorithm(self, rescheduling, seed):
+        try:
+            limit = RESCHEDULE_GENERATIONS if rescheduling else ITERATIONS_LIMIT
+            hits = self.result_cache.hits
+            best = [None]
+            
+            def on_best(generation, state, value):
+                best[0] = state
+            
+            # Generation number and best schedule so far, throttled so CallAfter does not flood the UI
+            live = ThrottledCallback(lambda generation, best_value: wx.CallAfter(
+                self.update_live_result, generation, limit,
+                SolverResult(best[0], best_value, generation, 'running', [])))
+            
+            def on_generation(generation, best_value, mean_value):
+                live(generation, best_value)
+            
+            if rescheduling:
+                self.result = reschedule(
+                    self.doctors, self.patients,
+                    self.previous_assignments, self.previous_patients,
+                    availability=self.availability,
+                    callback=on_generation,
+                    stop_event=self.stop_event,
+                    on_best=on_best
+                )
+            else:
+                self.result = solve(
+                    self.doctors, self.patients,
+                    availability=self.availability,
+                    seed=seed,
+                    population_size=POPULATION_SIZE,
+                    mutation_chance=MUTATION_CHANCE,
+                    iterations_limit=ITERATIONS_LIMIT,
+                    callback=on_generation,
+                    stop_event=self.stop_event,
+                    on_best=on_best,
+                    cache=self.result_cache
+                )
+            self.from_cache = self.result_cache.hits > hits
+            
+            wx.CallAfter(self.update_progress, 100)
+            wx.CallAfter(self.algorithm_completed)
+            
+        except Exception as e:
+            wx.CallAfter(self.algorithm_error, str(e))
+
+    def update_progress(self, value):
+        self.progress.SetValue(value)
+
+    def update_live_result(self, generation, limit, result):
+        if self.stop_event.is_set():
+            return
+        self.progress.SetValue(min(generation * 100 // limit, 100))
+        self.statusbar.SetStatusText(f"Thế hệ {generation} - điểm tốt nhất {result.value:.2f}")
+        if result.state is not None:
+            self.schedule_grid.update_schedule(result, self.patients, self.doctors)
+
+    def algorithm_completed(self):
+        # Update UI with results
+        self.schedule_grid.update_schedule(self.result, self.patients, self.doctors)
+        self.workload_panel.update_workload(self.result, self.doctors, self.patients)
+        
+        # Update summary
+        assigned_count = sum(1 for gene in self.result.state if gene >= 0)
+        score = self.result.value
+        
+        summary = self.summary_text.GetValue()
+        summary += f"\n\n=== KẾT QUẢ THUẬT TOÁN ===\n"
+        summary += f"Tổng số bệnh nhân được lịch hẹn: {assigned_count}/{len(self.patients)}\n"
+        summary += f"Điểm số của lịch: {score}\n"
+        
+        self.summary_text.SetValue(summary)
+        
+        self.previous_assignments = schedule_assignments(self.result.state, self.doctors, self.patients)
+        self.previous_patients = self.patients
+        self.reschedule_check.Enable(True)
+        
+        # Re-enable button and update status
+        self.run_btn.Enable(True)
+        self.stop_btn.Enable(False)
+        self.progress.SetValue(0)
+        status = "Đã dừng" if self.result.finish_reason == 'cancelled' else "Hoàn thành"
+        if self.from_cache:
+            status += " (lấy từ bộ đệm)"
+        self.statusbar.SetStatusText(f"{status} - {assigned_count}/{len(self.patients)} bệnh nhân được xếp lịch "
+                                     f"(thế hệ {self.result.generations})")
+
+    def algorithm_error(self, error_msg):
+        wx.MessageBox(f"Lỗi khi chạy thuật toán: {error_msg}", "Lỗi", wx.OK | wx.ICON_ERROR)
+        self.run_btn.Enable(True)
+        self.stop_btn.Enable(False)
+        self.progress.SetValue(0)
+        self.statusbar.SetStatusText("Sẵn sàng")
+
+    def on_exit(self, event):
+        self.stop_event.set()
+        self.Close()
+
+class MedicalSchedulerApp(wx.App):
+    def OnInit(self):
+        frame = MainFrame()
+        frame.Show()
+        return True
+
+def run_gui():
+    app = MedicalSchedulerApp()
+    app.MainLoop()
+
+if __name__ == '__main__':
+    run_gui()
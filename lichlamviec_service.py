@@ -0,0 +1,458 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import signal
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+from Lichlamviec1 import (
+    ISLAND_SEED, RESULT_CACHE_SIZE,
+    Calendar, ResultCache, ThrottledCallback, generate_doctor_schedule, has_doctor_schedule, schedule_output,
+    solve, validate_doctor, validate_patient,
+)
+
+# -------------------- CONSTANTS --------------------
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 2
+SERVICE_QUEUE_SIZE = 16  # jobs waiting for a worker; further submissions get 503
+SERVICE_JOB_HISTORY = 256  # finished jobs kept for polling, oldest dropped first
+MAX_REQUEST_BYTES = 64 << 20
+MAX_HEADERS = 100
+REQUEST_TIMEOUT = 30
+RETRY_AFTER = 5
+# name: (type, minimum, maximum, None allowed); 'names' = non-empty list of non-empty strings
+CALENDAR_SETTINGS = {
+    'days': ('names', None, None, False),
+    'shifts': ('names', None, None, False),
+    'slots_per_shift': (int, 1, None, False),
+    'weeks': (int, 1, None, False),
+    'slot_minutes': (int, 1, None, False),
+}
+JOB_SETTINGS = {
+    'population_size': (int, 1, None, False),
+    'mutation_chance': (float, 0, 1, False),
+    'elite_size': (int, 0, None, False),
+    'tournament_size': (int, 1, None, False),
+    'iterations_limit': (int, 0, None, False),
+    'stagnation_limit': (int, 0, None, True),
+    'time_limit': (float, 0, None, True),
+    'greedy_fraction': (float, 0, 1, False),
+    'memetic_rate': (float, 0, 1, False),
+    'decompose': (bool, None, None, False),
+    'time_budget': (float, 0, None, True),
+}
+FINISHED = ('done', 'failed', 'cancelled')
+STATUS_TEXT = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               409: 'Conflict', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+# -------------------- WORKER PROCESSES --------------------
+_progress_queue = None
+_cancel_flags = None
+
+def _init_service_worker(progress_queue, cancel_flags):
+    global _progress_queue, _cancel_flags
+    # Ctrl+C is handled by the server, which then shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+
+class CancelFlag:
+    # stop_event for solve() across processes: one shared byte per dispatcher, so a flag
+    # belongs to whichever job that dispatcher is running
+    def __init__(self, flags, index):
+        self.flags = flags
+        self.index = index
+
+    def is_set(self):
+        return bool(self.flags[self.index])
+
+    def set(self):
+        self.flags[self.index] = 1
+
+    def clear(self):
+        self.flags[self.index] = 0
+
+def _run_job(job_id, flag_index, doctors, patients, calendar, seed, settings, cache_dir, cache_size):
+    def report(generation, best_value, mean_value):
+        _progress_queue.put((job_id, generation, float(best_value), float(mean_value)))
+
+    callback = ThrottledCallback(report)
+    # Seeded, so resubmitting the same roster gives the same off shifts and can hit the cache
+    generate_doctor_schedule([doc for doc in doctors if not has_doctor_schedule(doc)], calendar, seed)
+    cache = ResultCache(cache_dir, cache_size) if cache_dir else None
+    started = time.monotonic()
+    result = solve(doctors, patients, seed=seed, callback=callback,
+                   stop_event=CancelFlag(_cancel_flags, flag_index), calendar=calendar, cache=cache, **settings)
+    callback.flush()
+    output = schedule_output(result, doctors, patients, calendar, time.monotonic() - started)
+    output['cached'] = bool(cache and cache.hits)
+    return output
+
+# -------------------- JOBS --------------------
+def check_setting(name, value, spec):
+    kind, minimum, maximum, optional = spec
+    if value is None and optional:
+        return
+    if kind == 'names':
+        valid = isinstance(value, list) and bool(value) and all(isinstance(item, str) and item for item in value)
+    elif kind is bool:
+        valid = isinstance(value, bool)
+    elif kind is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    if valid and kind in (int, float):
+        valid = (minimum is None or value >= minimum) and (maximum is None or value <= maximum)
+    if not valid:
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+def parse_job(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    records = {}
+    for field in ('doctors', 'patients'):
+        if not isinstance(payload.get(field), list):
+            raise ValueError(f"{field} must be a list")
+        records[field] = payload[field]
+    doctors = [validate_doctor(record, number, 'doctors') for number, record in enumerate(records['doctors'], 1)]
+    patients = [validate_patient(record, number, 'patients')
+                for number, record in enumerate(records['patients'], 1)]
+
+    calendar_settings = payload.get('calendar') or {}
+    settings = payload.get('settings') or {}
+    if not isinstance(calendar_settings, dict) or not isinstance(settings, dict):
+        raise ValueError("calendar and settings must be objects")
+    unknown = sorted(set(calendar_settings) - set(CALENDAR_SETTINGS)) + sorted(set(settings) - set(JOB_SETTINGS))
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(unknown)}")
+    for name, value in calendar_settings.items():
+        check_setting(name, value, CALENDAR_SETTINGS[name])
+    for name, value in settings.items():
+        check_setting(name, value, JOB_SETTINGS[name])
+    if settings.get('time_budget') is not None and (settings['time_budget'] <= 0 or settings.get('decompose')):
+        raise ValueError("time_budget must be positive and cannot be combined with decompose")
+    seed = payload.get('seed', ISLAND_SEED)
+    if not isinstance(seed, int) or isinstance(seed, bool):
+        raise ValueError(f"Invalid seed: {seed!r}")
+    calendar = Calendar(**calendar_settings)
+    return doctors, patients, calendar, seed, settings
+
+class Job:
+    def __init__(self, doctors, patients, calendar, seed, settings):
+        self.id = uuid.uuid4().hex
+        self.request = (doctors, patients, calendar, seed, settings)
+        self.n_doctors = len(doctors)
+        self.n_patients = len(patients)
+        self.status = 'queued'
+        self.progress = None
+        self.output = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.flag = None
+        # Streams wait on updated; every change bumps version and swaps in a fresh event
+        self.version = 0
+        self.updated = asyncio.Event()
+
+    def touch(self):
+        self.version += 1
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+    def summary(self):
+        summary = {'id': self.id, 'status': self.status, 'doctors': self.n_doctors, 'patients': self.n_patients,
+                   'created': self.created, 'started': self.started, 'finished': self.finished,
+                   'progress': self.progress, 'error': self.error}
+        if self.output is not None:
+            summary.update({key: self.output[key] for key in ('score', 'generations', 'finish_reason',
+                                                              'elapsed_seconds', 'assigned', 'cached')})
+        return summary
+
+# -------------------- SERVICE --------------------
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ScheduleService:
+    # Requests are handled on the event loop; solves run in a process pool fed by one dispatcher
+    # task per worker. Jobs beyond the queue size are refused instead of piling up in memory.
+    def __init__(self, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE, history=SERVICE_JOB_HISTORY,
+                 cache_dir=None, cache_size=RESULT_CACHE_SIZE):
+        if workers < 1 or queue_size < 1 or history < 1:
+            raise ValueError(f"Invalid service settings: workers={workers}, queue_size={queue_size}, "
+                             f"history={history}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.history = history
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.jobs = OrderedDict()
+        self.queued = 0
+        self.running = 0
+        self.server = None
+
+    async def start(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        self.loop = asyncio.get_running_loop()
+        # spawn, not fork: the event loop process already runs threads
+        self.context = multiprocessing.get_context('spawn')
+        self.progress_queue = self.context.Queue()
+        self.cancel_flags = self.context.RawArray('b', self.workers)
+        self.pool = self.make_pool()
+        self.pending = asyncio.Queue()
+        self.pump = asyncio.create_task(self.pump_progress())
+        self.dispatchers = [asyncio.create_task(self.dispatch(index)) for index in range(self.workers)]
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for index in range(self.workers):
+            CancelFlag(self.cancel_flags, index).set()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.progress_queue.put(None)
+        await self.pump
+
+    def make_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self.context,
+                                   initializer=_init_service_worker, initargs=(self.progress_queue, self.cancel_flags))
+
+    async def pump_progress(self):
+        while True:
+            message = await self.loop.run_in_executor(None, self.progress_queue.get)
+            if message is None:
+                return
+            job_id, generation, best_value, mean_value = message
+            job = self.jobs.get(job_id)
+            if job is not None and job.status == 'running':
+                job.progress = {'generation': generation, 'best': best_value, 'mean': mean_value}
+                job.touch()
+
+    async def dispatch(self, index):
+        flag = CancelFlag(self.cancel_flags, index)
+        while True:
+            job = await self.pending.get()
+            if job.status != 'queued':
+                continue
+            self.queued -= 1
+            self.running += 1
+            flag.clear()
+            job.flag = flag
+            job.status = 'running'
+            job.started = time.time()
+            job.touch()
+            pool = self.pool
+            try:
+                job.output = await self.loop.run_in_executor(pool, _run_job, job.id, index, *job.request,
+                                                             self.cache_dir, self.cache_size)
+            except BrokenProcessPool:
+                # A worker died, e.g. out of memory; the jobs after it get a fresh pool
+                job.error = "Worker process terminated"
+                if pool is self.pool:
+                    self.pool = self.make_pool()
+                    pool.shutdown(wait=False)
+            except Exception as exc:
+                job.error = f"{type(exc).__name__}: {exc}"
+            finally:
+                self.running -= 1
+            if job.error:
+                job.status = 'failed'
+            else:
+                job.status = 'cancelled' if job.output['finish_reason'] == 'cancelled' else 'done'
+            self.finish(job)
+
+    def finish(self, job):
+        job.request = None
+        job.flag = None
+        job.finished = time.time()
+        job.touch()
+        finished = [job_id for job_id, other in self.jobs.items() if other.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def submit(self, body):
+        # Checked before parsing, so a full service spends no time on the payload
+        if self.queued >= self.queue_size:
+            raise asyncio.QueueFull
+        job = Job(*parse_job(json.loads(body)))
+        self.jobs[job.id] = job
+        self.queued += 1
+        self.pending.put_nowait(job)
+        return job
+
+    def cancel(self, job):
+        if job.status == 'queued':
+            self.queued -= 1
+            job.status = 'cancelled'
+            self.finish(job)
+        elif job.status == 'running':
+            # The solver stops at the next generation and the best schedule so far is kept
+            job.flag.set()
+
+    def stats(self):
+        return {'status': 'ok', 'workers': self.workers, 'running': self.running, 'queued': self.queued,
+                'queue_size': self.queue_size, 'jobs': len(self.jobs)}
+
+    # -------------------- HTTP --------------------
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+            except RequestError as exc:
+                await send_json(writer, exc.status, {'error': str(exc)})
+                return
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            await self.route(method, path, body, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def route(self, method, path, body, writer):
+        parts = [part for part in path.split('/') if part]
+        if parts == ['health']:
+            if method != 'GET':
+                return await send_json(writer, 405, {'error': "Method not allowed"})
+            return await send_json(writer, 200, self.stats())
+        if parts == ['jobs']:
+            if method == 'GET':
+                return await send_json(writer, 200, {'jobs': [job.summary() for job in self.jobs.values()]})
+            if method != 'POST':
+                return await send_json(writer, 405, {'error': "Method not allowed"})
+            try:
+                job = self.submit(body)
+            except asyncio.QueueFull:
+                return await send_json(writer, 503, {'error': "Job queue is full", 'retry_after': RETRY_AFTER},
+                                       [f"Retry-After: {RETRY_AFTER}"])
+            except ValueError as exc:
+                return await send_json(writer, 400, {'error': str(exc)})
+            return await send_json(writer, 202, job.summary(), [f"Location: /jobs/{job.id}"])
+
+        job = self.jobs.get(parts[1]) if len(parts) in (2, 3) and parts[0] == 'jobs' else None
+        if job is None:
+            return await send_json(writer, 404, {'error': "Not found"})
+        action = parts[2] if len(parts) == 3 else None
+        if (method, action) == ('DELETE', None):
+            self.cancel(job)
+            return await send_json(writer, 200, job.summary())
+        if method != 'GET':
+            return await send_json(writer, 405, {'error': "Method not allowed"})
+        if action is None:
+            return await send_json(writer, 200, job.summary())
+        if action == 'result':
+            if job.output is None:
+                return await send_json(writer, 409, {'error': f"Job is {job.status}", 'status': job.status})
+            return await send_json(writer, 200, job.output)
+        if action == 'events':
+            return await stream_events(writer, job)
+        return await send_json(writer, 404, {'error': "Not found"})
+
+async def read_request(reader):
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) != 3:
+        raise RequestError(400, "Malformed request line")
+    method, target, _ = request_line
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise RequestError(400, "Too many headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, "Invalid Content-Length")
+    if length < 0:
+        raise RequestError(400, "Invalid Content-Length")
+    if length > MAX_REQUEST_BYTES:
+        raise RequestError(413, f"Request body over {MAX_REQUEST_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), urlsplit(target).path, body
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", *headers, "Connection: close"]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+async def send_json(writer, status, payload, headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    writer.write(response_head(status, ["Content-Type: application/json; charset=utf-8",
+                                        f"Content-Length: {len(body)}", *headers]) + body)
+    await writer.drain()
+
+async def stream_events(writer, job):
+    # JSON lines until the job finishes. Updates that arrive while a slow client is still
+    # draining are folded into the next line, so a stream never buffers more than one summary.
+    writer.write(response_head(200, ["Content-Type: application/x-ndjson; charset=utf-8",
+                                     "Cache-Control: no-cache"]))
+    while True:
+        updated, version = job.updated, job.version
+        writer.write(json.dumps(job.summary(), ensure_ascii=False).encode('utf-8') + b'\n')
+        await writer.drain()
+        if job.status in FINISHED:
+            return
+        if job.version == version:
+            await updated.wait()
+
+# -------------------- COMMAND LINE --------------------
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Dịch vụ lập lịch HTTP/JSON chạy nội bộ: gửi dữ liệu bác sĩ và "
+                                                 "bệnh nhân lên POST /jobs, theo dõi GET /jobs/<id> hoặc "
+                                                 "/jobs/<id>/events, lấy kết quả ở /jobs/<id>/result.")
+    parser.add_argument('--host', default=SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS, help="Số tiến trình giải song song")
+    parser.add_argument('--queue-size', type=int, default=SERVICE_QUEUE_SIZE,
+                        help="Số yêu cầu chờ tối đa; vượt quá thì trả 503")
+    parser.add_argument('--history', type=int, default=SERVICE_JOB_HISTORY,
+                        help="Số yêu cầu đã xong được giữ lại để tra cứu")
+    parser.add_argument('--cache', metavar='DIR', help="Thư mục bộ đệm kết quả dùng chung cho các yêu cầu")
+    parser.add_argument('--cache-size', type=int, default=RESULT_CACHE_SIZE, help="Số kết quả tối đa trong --cache")
+    return parser
+
+async def serve(service, host, port):
+    host, port = await service.start(host, port)
+    print(f"Dịch vụ lập lịch chạy tại http://{host}:{port}", file=sys.stderr)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.stop()
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.cache_size < 1:
+        parser.error("--cache-size phải lớn hơn 0")
+    try:
+        service = ScheduleService(args.workers, args.queue_size, args.history, args.cache, args.cache_size)
+    except ValueError as exc:
+        parser.error(str(exc))
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
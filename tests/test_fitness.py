@@ -0,0 +1,70 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Lichlamviec1 as lich  # noqa: E402
+
+STATES = 60
+
+@pytest.fixture(scope='module')
+def roster():
+    with open(ROOT / 'doctor1.json', encoding='utf-8') as f:
+        doctors = json.load(f)
+    with open(ROOT / 'patin1.json', encoding='utf-8') as f:
+        patients = json.load(f)
+    lich.generate_doctor_schedule([doc for doc in doctors if not lich.has_doctor_schedule(doc)], seed=1)
+    return doctors, patients
+
+def random_states(problem, count):
+    random.seed(7)
+    for n in range(count):
+        state = problem.generate_greedy_state() if n % 4 == 0 else problem.generate_random_state()
+        for _ in range(n % 5):
+            state = problem.mutate(problem.crossover(state, problem.generate_random_state()))
+        if n % 3 == 0:
+            state = problem.repair(state)
+        yield state
+
+def test_scores_agree(roster):
+    problem = lich.ScheduleProblem(*roster)
+    tracked = lich.ScheduleProblem(*roster, incremental=True)
+    states = list(random_states(problem, STATES))
+    batch = problem.evaluator.evaluate(problem.evaluator.encode_population(states))
+    for state, score in zip(states, batch):
+        expected = problem.compute_value(state)
+        assert score == pytest.approx(expected)
+        assert tracked.track(state).fitness == pytest.approx(expected)
+
+def random_assign(problem, state):
+    idx = random.randrange(len(problem.patients))
+    choices = problem.candidates.choices[idx]
+    state.assign(idx, random.choice(choices) if choices and random.random() < 0.9 else -1)
+
+def assert_consistent(problem, state):
+    assert state.fitness == pytest.approx(problem.compute_value(list(state)))
+    rebuilt = problem.track(list(state))
+    for name in lich.SHARED_FIELDS + ('counts', 'workload', 'accepted_per_doctor'):
+        assert list(getattr(state, name)) == list(getattr(rebuilt, name)), name
+
+@pytest.mark.parametrize('shared_min_length', [lich.SHARED_MIN_LENGTH, 1])
+def test_tracked_copies_stay_independent(roster, monkeypatch, shared_min_length):
+    # shared_min_length=1 puts every list of the small roster in a SharedList
+    monkeypatch.setattr(lich, 'SHARED_MIN_LENGTH', shared_min_length)
+    problem = lich.ScheduleProblem(*roster, incremental=True)
+    states = list(random_states(problem, 8))
+    for _ in range(200):
+        parent = random.choice(states)
+        child = problem.mutate(parent.copy())
+        # Both sides keep changing after the copy; neither may see the other's writes
+        for _ in range(random.randint(1, 4)):
+            random_assign(problem, child)
+            random_assign(problem, parent)
+        assert_consistent(problem, parent)
+        assert_consistent(problem, child)
+        states[random.randrange(len(states))] = child
@@ -0,0 +1,90 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Lichlamviec1 as lich  # noqa: E402
+
+CHUNK_SIZES = [1, 3, 4, 64, lich.LOAD_CHUNK_SIZE]
+
+VALID = {
+    'array': ('[{"a": 1}, {"b": "x,]"} ,\n{"c": [1, {"d": 2}]}]  \n', [{'a': 1}, {'b': 'x,]'}, {'c': [1, {'d': 2}]}]),
+    'empty_array': ('[ ]', []),
+    'empty_file': ('', []),
+    'ndjson': ('{"a": 1}\n\n{"b": 2}\n', [{'a': 1}, {'b': 2}]),
+}
+
+INVALID = {
+    'truncated': '[{"specialty": "a"}',
+    'truncated_after_comma': '[{"a": 1},',
+    'truncated_record': '[{"a": 1}, {"b": ',
+    'missing_comma': '[{"a": 1} {"b": 2}]',
+    'doubled_comma': '[{"a": 1},,{"b": 2}]',
+    'leading_comma': '[,{"a": 1}]',
+    'trailing_comma': '[{"a": 1},]',
+    'trailing_garbage': '[{"a": 1}] x',
+    'second_array': '[{"a": 1}][]',
+}
+
+def write(tmp_path, text):
+    path = tmp_path / 'records.json'
+    path.write_text(text, encoding='utf-8')
+    return path
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', VALID)
+def test_valid_files(tmp_path, name, chunk_size):
+    text, expected = VALID[name]
+    assert list(lich.iter_json_records(write(tmp_path, text), chunk_size)) == expected
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', INVALID)
+def test_broken_files(tmp_path, name, chunk_size):
+    path = write(tmp_path, INVALID[name])
+    with pytest.raises(ValueError, match='record|closing'):
+        list(lich.iter_json_records(path, chunk_size))
+
+@pytest.mark.parametrize('chunk_size', [1, 4, lich.LOAD_CHUNK_SIZE])
+def test_bundled_rosters_load_whole(chunk_size):
+    for name, load in (('doctor1.json', lich.load_doctors), ('patin1.json', lich.load_patients)):
+        with open(ROOT / name, encoding='utf-8') as f:
+            expected = json.load(f)
+        assert len(load(ROOT / name, chunk_size)) == len(expected)
+
+BAD_DOCTOR_FIELDS = [
+    {'max_patients_per_shift': True},
+    {'max_patients_per_shift': -1},
+    {'free_slots': 5},
+    {'free_slots': [True]},
+    {'free_ranges': [[0]]},
+    {'free_ranges': [[0, 1.5]]},
+    {'off_shifts': [[0, 0]]},
+    {'off_shifts': [[0, False, 'Mon_morning']]},
+]
+
+@pytest.mark.parametrize('fields', BAD_DOCTOR_FIELDS)
+def test_invalid_doctor_fields(fields):
+    with pytest.raises(ValueError, match='record 1'):
+        lich.validate_doctor(dict({'name': 'A', 'specialty': 'x'}, **fields), 1, 'doctors.json')
+
+def test_valid_doctor_fields():
+    doctor = lich.validate_doctor({'name': 'A', 'specialty': 'x', 'free_slots': ['1', 2], 'free_ranges': [[0, 10]],
+                                   'off_shifts': [[0, 1, 'Mon_afternoon']]}, 1)
+    assert doctor['free_slots'] == ['1', '2']
+    assert lich.DEFAULT_CALENDAR.free_mask(doctor) == (1 << 10) - 1
+
+@pytest.mark.parametrize('n_doctors', [0, 3])
+def test_snapshot_round_trip(tmp_path, n_doctors):
+    doctors = lich.load_doctors(ROOT / 'doctor1.json')[:n_doctors]
+    patients = lich.load_patients(ROOT / 'patin1.json')
+    lich.generate_doctor_schedule(doctors, seed=1)
+    lich.save_snapshot(tmp_path, doctors, patients)
+    snapshot = lich.RosterSnapshot(tmp_path)
+    assert [doc['name'] for doc in snapshot.doctors] == [doc['name'] for doc in doctors]
+    assert [lich.DEFAULT_CALENDAR.free_mask(doc) for doc in snapshot.doctors] == \
+        [lich.DEFAULT_CALENDAR.free_mask(doc) for doc in doctors]
+    assert len(snapshot.patients) == len(patients)